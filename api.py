@@ -1,11 +1,24 @@
-import requests, logging
-from datetime import datetime
+import importlib, logging, json, time
+from datetime import datetime, timezone
+from codec import default_codec
 from dataclasses import dataclass, asdict
+from typing import Optional
 
 API_BASE_URL = "https://stanfordohs.pronto.io/"
 
+# Default connection pool settings for ProntoClient
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+
+# status_code is the HTTP status if the server answered, retry_after is the server's
+# Retry-After in seconds if it sent one, and network_error is True when the request
+# never got a response (connection refused, reset, timed out)
 class BackendError(Exception):
-    pass
+    def __init__(self, message="", status_code=None, retry_after=None, network_error=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.network_error = network_error
 # Dataclass for device information
 @dataclass
 class DeviceInfo:
@@ -13,332 +26,575 @@ class DeviceInfo:
     browserversion: str
     osname: str
     type: str
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Dataclass for one client call, passed to the metrics sink when it finishes
+# latency is in seconds, retries counts extra attempts, cache_hit means no request was sent,
+# and shared means the call waited on an identical in-flight call instead of sending its own
+@dataclass(slots=True)
+class CallRecord:
+    endpoint: str
+    started_at: float = 0.0
+    latency: float = 0.0
+    status_code: Optional[int] = None
+    bytes_out: int = 0
+    bytes_in: int = 0
+    retries: int = 0
+    cache_hit: bool = False
+    shared: bool = False
+    error: Optional[str] = None
+# Logging is left to the application; nothing is configured on import
 logger = logging.getLogger(__name__)
 
+# Endpoints that only read data, so identical calls can safely share or reuse a response
+READ_ENDPOINTS = frozenset({
+    "bubble.list",
+    "bubble.history",
+    "bubble.info",
+    "user.info",
+    "user.mutualgroups",
+    "message.search",
+    "bubble.membershipsearch",
+})
+
+# Content codings the clients ask for, most preferred first. Only the ones the HTTP
+# library can decode are offered: br needs brotli and zstd needs zstandard installed.
+ENCODING_PREFERENCE = ("zstd", "br", "gzip", "deflate")
+
+# Endpoints that are called without an access token
+UNAUTHENTICATED_ENDPOINTS = frozenset({
+    "user.verify",
+    "user.login",
+    "user.tokenlogin",
+})
+
+# Function to get the endpoint name out of a URL or path, e.g. "bubble.list" for "api/v3/bubble.list"
+def endpoint_name(url):
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+# Function to build an Accept-Encoding header from the codings an HTTP library can decode
+def accept_encoding(supported):
+    supported = {coding.strip() for coding in supported}
+    return ", ".join(coding for coding in ENCODING_PREFERENCE if coding in supported)
+
+# Function to get how many body bytes a requests response took on the wire, before decompression
+def wire_size(response):
+    size = len(response.content)
+    tell = getattr(response.raw, "tell", None)
+    return tell() if tell is not None else size
+
+# Function to turn a request payload into a hashable key part
+def payload_key(payload):
+    return json.dumps(payload, sort_keys=True, default=str)
+
+# Function to turn a Retry-After header, either seconds or an HTTP date, into seconds
+def parse_retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+#CLIENT
+# Endpoint methods shared by ProntoClient and AsyncProntoClient. Each method only
+# builds the request payload and hands it to self._post, which the sync client
+# runs blocking and the async client returns as a coroutine.
+class _ProntoEndpoints:
+    base_url = API_BASE_URL
+    rate_limiter = None
+    retry_policy = None
+    circuit_breaker = None
+    codec = None
+    token_manager = None
+    metrics = None
+    validators = None
+
+    # Hand a finished call to the metrics sink; a failing sink never fails the call
+    def _record(self, call):
+        try:
+            self.metrics.record(call)
+        except Exception as err:
+            logger.error(f"Metrics sink failed: {err}")
+
+    # True if the call should get its access token from the token manager
+    def _uses_token_manager(self, endpoint, access_token):
+        return access_token is None and self.token_manager is not None and endpoint not in UNAUTHENTICATED_ENDPOINTS
+
+    # Encode a request payload with the client's codec, or None for an empty body
+    def _encode(self, payload):
+        return self.codec.dumps(payload) if payload is not None else None
+
+    # Build the full URL and headers for a request
+    # url is either a full URL or a path relative to base_url, such as "api/v3/bubble.list"
+    def _request_parts(self, url, access_token=None):
+        if not url.startswith("http"):
+            url = f"{self.base_url}{url}"
+        headers = {
+            "Content-Type": "application/json",
+        }
+        if access_token is not None:
+            headers["Authorization"] = f"Bearer {access_token}"
+        return url, headers
+
+    # Conditional request steps shared by the sync and async clients
+
+    # Returns the stored response to revalidate, adding its validators to headers, or None
+    def _revalidating(self, endpoint, payload, access_token, headers):
+        if self.validators is None:
+            return None
+        entry = self.validators.lookup(endpoint, payload, access_token)
+        if entry is not None:
+            headers.update(entry.headers())
+        return entry
+
+    # Decode a response body, keeping its validators for the next call
+    def _decode(self, endpoint, payload, access_token, response):
+        result = self.codec.loads(response.content)
+        if self.validators is not None:
+            self.validators.record(endpoint, payload, access_token, response.headers, result)
+        return result
+
+    # Rate limiting, retry and circuit breaker steps shared by the sync and async send loops
+
+    # Returns how long to wait before sending, or raises BackendError if the circuit is open
+    def _before_attempt(self, endpoint, access_token):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before(endpoint)
+        if self.rate_limiter is not None:
+            return self.rate_limiter.reserve(endpoint, access_token)
+        return 0.0
+
+    # Returns how long to wait before retrying err, or re-raises it
+    def _after_failure(self, endpoint, attempt, err):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure(endpoint, err)
+        delay = self.retry_policy.delay(attempt, err, endpoint) if self.retry_policy is not None else None
+        if delay is None:
+            raise err
+        logger.warning(f"Retrying {endpoint} in {delay:.2f}s after: {err}")
+        return delay
+
+    def _after_success(self, endpoint):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(endpoint)
+
+    #AUTHENTICATION
+    def requestVerificationEmail(self, email):
+        return self._post("https://accounts.pronto.io/api/v1/user.verify", {"email": email})
+
+    def verification_code_to_login_token(self, email, verification_code):
+        device_info = DeviceInfo(
+            browsername="Firefox",
+            browserversion="130.0.0",
+            osname="Windows",
+            type="WEB"
+        )
+        request_payload = {
+            "email": email,
+            "code": verification_code,
+            "device": asdict(device_info)
+        }
+        logger.debug(f"Payload being sent: {request_payload}")
+        return self._post("https://accounts.pronto.io/api/v3/user.login", request_payload)
+
+    def login_token_to_access_token(self, logintoken):
+        device_info = {
+            "browsername": "firefox",
+            "browserversion": "130.0.0",
+            "osname": "macOS",
+            "type": "WEB",
+            "uuid": "314c9314-d5e5-4ae4-84e2-9f2f3938ca28",
+            "osversion": "10.15.6",
+            "appversion": "1.0.0",
+            }
+        request_payload = {
+            "logintokens": [logintoken],
+            "device": device_info,
+        }
+        return self._post("api/v1/user.tokenlogin", request_payload)
+
+    #BUBBLES
+    def getUsersBubbles(self, access_token):
+        return self._post("api/v3/bubble.list", access_token=access_token)
+
+    def get_bubble_messages(self, access_token, bubbleID, latestMessageID=None):
+        request_payload = {"bubble_id": bubbleID}
+        if latestMessageID is not None:
+            request_payload["latest"] = latestMessageID
+        return self._post("api/v1/bubble.history", request_payload, access_token)
+
+    def get_bubble_info(self, access_token, bubbleID):
+        return self._post("api/v2/bubble.info", {"bubble_id": bubbleID}, access_token)
+
+    def markBubble(self, access_token, bubbleID):
+        return self._post("api/v1/bubble.mark", {"bubble_id": bubbleID}, access_token)
+
+    def createDM(self, access_token, id, orgID):
+        request_payload = {
+            "organization_id": orgID,
+            "user_id": id,
+        }
+        return self._post("api/v1/dm.create", request_payload, access_token)
+
+    def createBubble(self, access_token, orgID, title, category_id):
+        request_payload = {
+            "organization_id": orgID,
+            "title": title,
+        }
+        if category_id is not None:
+            request_payload["category_id"] = category_id
+        return self._post("api/v1/bubble.create", request_payload, access_token)
+
+    def addMemberToBubble(self, access_token, bubbleID, invitations, sendemails, sendsms):
+        request_payload = {
+            "bubbleID": bubbleID,
+            "invitations": invitations,
+            "sendemails": sendemails,
+            "sendsms": sendsms,
+        }
+        return self._post("api/v1/bubble.invite", request_payload, access_token)
+
+    def kickUserFromBubble(self, access_token, bubbleID, users):
+        request_payload = {
+            "bubble_id": bubbleID,
+            "users": users,
+        }
+        return self._post("api/v1/bubble.kick", request_payload, access_token)
+
+    def updateBubble(self, access_token, bubbleID, title=None, category_id=None, changetitle=None, addmember=None, leavegroup=None, create_message=None, assign_task=None, pin_message=None, changecategory=None, removemember=None, create_videosession=None, videosessionrecordcloud=None, create_announcement=None):
+        request_payload = {
+            "bubble_id": bubbleID,
+        }
+        optional_fields = {
+            "title": title,
+            "category_id": category_id,
+            "changetitle": changetitle,
+            "addmember": addmember,
+            "leavegroup": leavegroup,
+            "create_message": create_message,
+            "assign_task": assign_task,
+            "pin_message": pin_message,
+            "changecategory": changecategory,
+            "removemember": removemember,
+            "create_videosession": create_videosession,
+            "videosessionrecordcloud": videosessionrecordcloud,
+            "create_announcement": create_announcement,
+        }
+        for key, value in optional_fields.items():
+            if value is not None:
+                request_payload[key] = value
+        return self._post("api/v1/bubble.update", request_payload, access_token)
+
+    def pinMessage(self, access_token, pinned_message_id, pinned_message_expires_at):
+        request_payload = {
+            "pinned_message_id": pinned_message_id,
+            "pinned_message_expires_at": pinned_message_expires_at,
+        }
+        return self._post("api/v1/bubble.update", request_payload, access_token)
+
+    def createInvite(self, bubbleID, access, expires, access_token):
+        request_payload = {
+            "access": access,
+            "expires": expires,
+        }
+        return self._post(f"api/clients/groups/{bubbleID}/invites", request_payload, access_token)
+
+    #MESSAGES
+    def send_message_to_bubble(self, access_token, bubbleID, created_at, message, userID, uuid, parentmessage_id, messagemedia=None):
+        request_payload = {
+            "bubble_id": bubbleID,
+            "created_at": created_at,
+            "id": "Null",
+            "message": message,
+            "messagemedia": list(messagemedia) if messagemedia else [],
+            "user_id": userID,
+            "uuid": uuid
+        }
+        if parentmessage_id is not None:
+            request_payload["parentmessage_id"] = parentmessage_id
+        return self._post("api/v1/message.create", request_payload, access_token)
+
+    def addReaction(self, access_token, messageID, reactiontype_id):
+        request_payload = {
+            "message_id": messageID,
+            "reactiontype_id": reactiontype_id,
+        }
+        return self._post("api/v1/message.addreaction", request_payload, access_token)
+
+    def removeReaction(self, access_token, messageID, reactiontype_id):
+        request_payload = {
+            "message_id": messageID,
+            "reactiontype_id": reactiontype_id,
+        }
+        return self._post("api/v1/message.removereaction", request_payload, access_token)
+
+    def editMessgae(self, access_token, newMessage, messageID):
+        request_payload = {
+            "message": newMessage,
+            "message_id": messageID,
+        }
+        return self._post("api/v1/message.edit", request_payload, access_token)
+
+    def deleteMessage(self, access_token, messageID):
+        return self._post("api/v1/message.delete", {"message_id": messageID}, access_token)
+
+    #USER INFO
+    def userInfo(self, access_token, id):
+        return self._post("api/v1/user.info", {"id": id}, access_token)
+
+    def mutualGroups(self, access_token, id):
+        return self._post("api/v1/user.mutualgroups", {"id": id}, access_token)
+
+    def setStatus(self, access_token, userID, isonline, lastpresencetime):
+        request_payload = {
+            "data": [
+                {
+                    "user_id": userID,
+                    "isonline": isonline,
+                    "lastpresencetime": lastpresencetime
+                }
+            ]
+        }
+        return self._post("api/clients/users/presence", request_payload, access_token)
+
+    def setStatuses(self, access_token, statuses):
+        return self._post("api/clients/users/presence", {"data": list(statuses)}, access_token)
+
+    #OTHER
+    def searchMessage(self, access_token, query, bubbleID=None, orderby=None, user_ids=None, size=25, from_=0):
+        request_payload = {
+            "search_type": "messages",
+            "size": size,
+            "from": from_,
+            "query": query,
+        }
+        if bubbleID is not None:
+            request_payload["bubble_id"] = bubbleID
+        if orderby is not None:
+            request_payload["orderby"] = orderby
+        if user_ids is not None:
+            request_payload["user_ids"] = user_ids
+        return self._post("api/v1/message.search", request_payload, access_token)
+
+    def bubbleMembershipSearch(self, access_token, bubble_id, orderby=["firstname", "lastname"], includeself=True, page=None):
+        request_payload = {
+            "orderby": orderby,
+            "includeself": includeself,
+            "bubble_id": bubble_id,
+        }
+        if page is not None:
+            request_payload["page"] = page
+        return self._post("api/v1/bubble.membershipsearch", request_payload, access_token)
+
+# Client that owns a pooled keep-alive requests.Session, so repeated calls reuse
+# the same TCP+TLS connection instead of paying a fresh handshake per request.
+# pool_connections is the number of per-host pools kept around, pool_maxsize is the
+# number of connections kept alive per host, and pool_block=True caps each host at
+# pool_maxsize concurrent connections instead of opening throwaway extras.
+# cache is an optional cache.ResponseCache that serves repeated reads without a request.
+# single_flight is an optional singleflight.SingleFlight that makes concurrent identical
+# reads from different threads share one request.
+# rate_limiter, retry_policy and circuit_breaker are optional ratelimit.RateLimiter,
+# ratelimit.RetryPolicy and ratelimit.CircuitBreaker instances applied to every request.
+# codec encodes and decodes JSON bodies, see codec.py; the fastest installed one by default.
+# token_manager is an optional tokens.TokenManager; calls made with access_token=None then
+# use one of its tokens and are retried once with a refreshed token after a 401.
+# metrics is an optional sink whose record(call) gets a CallRecord for every call, see metrics.py.
+# validators is an optional conditional.ValidatorCache that sends repeated reads with
+# If-None-Match / If-Modified-Since and reuses the stored body when the server answers 304.
+# Responses are requested compressed with the best coding urllib3 can decode (zstd, br, gzip).
+# requests is imported when the first client is created rather than when api is imported.
+class ProntoClient(_ProntoEndpoints):
+    def __init__(self, base_url=API_BASE_URL, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE, pool_block=False, timeout=None, session=None, cache=None, single_flight=None, rate_limiter=None, retry_policy=None, circuit_breaker=None, codec=None, token_manager=None, metrics=None, validators=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.metrics = metrics
+        self.validators = validators
+        self.token_manager = token_manager
+        self.codec = codec if codec is not None else default_codec()
+        self.cache = cache
+        self.single_flight = single_flight
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.request import ACCEPT_ENCODING
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Connection": "keep-alive", "Accept-Encoding": accept_encoding(ACCEPT_ENCODING.split(","))})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    # Send a POST to a Pronto endpoint and return the decoded JSON body
+    def _post(self, url, payload=None, access_token=None):
+        endpoint = endpoint_name(url)
+        if self._uses_token_manager(endpoint, access_token):
+            access_token = self.token_manager.get_token()
+            try:
+                return self._post(url, payload, access_token)
+            except BackendError as err:
+                if err.status_code != 401:
+                    raise
+                return self._post(url, payload, self.token_manager.handle_unauthorized(access_token))
+        if self.metrics is None:
+            return self._call(url, endpoint, payload, access_token)
+        call = CallRecord(endpoint, started_at=time.time())
+        started = time.perf_counter()
+        try:
+            return self._call(url, endpoint, payload, access_token, call)
+        except BackendError as err:
+            call.error = str(err)
+            raise
+        finally:
+            call.latency = time.perf_counter() - started
+            self._record(call)
+
+    # Answer from the cache when it has a fresh copy, otherwise send the request
+    def _call(self, url, endpoint, payload, access_token, call=None):
+        if self.cache is not None:
+            hit, cached = self.cache.lookup(endpoint, payload, access_token)
+            if hit:
+                if call is not None:
+                    call.cache_hit = True
+                return cached
+        if self.single_flight is not None:
+            key = (endpoint, payload_key(payload), access_token)
+            result = self.single_flight.do(key, lambda: self._send(url, payload, access_token, call))
+            # Only the leader's record saw a response; followers were answered by it
+            if call is not None and call.status_code is None:
+                call.shared = True
+        else:
+            result = self._send(url, payload, access_token, call)
+        if self.cache is not None:
+            self.cache.record(endpoint, payload, access_token, result)
+        return result
+
+    # Send the request under the rate limiter, retrying failures the retry policy allows
+    def _send(self, url, payload=None, access_token=None, call=None):
+        endpoint = endpoint_name(url)
+        attempt = 0
+        while True:
+            wait = self._before_attempt(endpoint, access_token)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = self._request(url, payload, access_token, call)
+            except BackendError as err:
+                time.sleep(self._after_failure(endpoint, attempt, err))
+                attempt += 1
+                if call is not None:
+                    call.retries += 1
+                continue
+            self._after_success(endpoint)
+            return result
+
+    # Send one request over the pooled session
+    def _request(self, url, payload=None, access_token=None, call=None):
+        import requests
+        endpoint = endpoint_name(url)
+        url, headers = self._request_parts(url, access_token)
+        entry = self._revalidating(endpoint, payload, access_token, headers)
+        response = None
+        try:
+            body = self._encode(payload)
+            if call is not None and body is not None:
+                call.bytes_out += len(body)
+            response = self.session.post(url, headers=headers, data=body, timeout=self.timeout)
+            if call is not None:
+                call.status_code = response.status_code
+                call.bytes_in += wire_size(response)
+            if entry is not None and response.status_code == 304:
+                return self.validators.not_modified(endpoint, entry)
+            response.raise_for_status()
+            return self._decode(endpoint, payload, access_token, response)
+        except requests.exceptions.HTTPError as http_err:
+            logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
+            raise BackendError(f"HTTP error occurred: {http_err}", status_code=response.status_code, retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        except requests.exceptions.RequestException as req_err:
+            logger.error(f"Request exception occurred: {req_err}")
+            raise BackendError(f"Request exception occurred: {req_err}", network_error=True)
+        except Exception as err:
+            logger.error(f"An unexpected error occurred: {err}")
+            raise BackendError(f"An unexpected error occurred: {err}")
+
+# Shared client behind the module-level functions below
+_default_client = None
+
+# Function to get the shared client, creating it on first use
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        _default_client = ProntoClient()
+    return _default_client
+
+# Function to replace the shared client, e.g. with one that has a bigger pool or a timeout
+def set_default_client(client):
+    global _default_client
+    _default_client = client
+
 #AUTHENTICATION FUNCTIONS
 # Function to verify user email
 def requestVerificationEmail(email):
-    url = "https://accounts.pronto.io/api/v1/user.verify"
-    payload = {"email": email}
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        raise BackendError(f"HTTP error occurred: {http_err}")
-    except Exception as err:
-        raise BackendError(f"An error occurred: {err}")
+    return get_default_client().requestVerificationEmail(email)
 
 # Function to log in using email and verification code
 def verification_code_to_login_token(email, verification_code):
-    url = "https://accounts.pronto.io/api/v3/user.login"
-    device_info = DeviceInfo(
-        browsername="Firefox",
-        browserversion="130.0.0",
-        osname="Windows",
-        type="WEB"
-    )
-    request_payload = {
-        "email": email,
-        "code": verification_code,
-        "device": asdict(device_info)
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    logger.info(f"Payload being sent: {request_payload}")
-    try:
-        response = requests.post(url, json=request_payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().verification_code_to_login_token(email, verification_code)
 
 # Function to get user accesstoken from logintoken
 def login_token_to_access_token(logintoken):
-    url = f"{API_BASE_URL}api/v1/user.tokenlogin"
-    device_info = {
-        "browsername": "firefox",
-        "browserversion": "130.0.0",
-        "osname": "macOS",
-        "type": "WEB",
-        "uuid": "314c9314-d5e5-4ae4-84e2-9f2f3938ca28",
-        "osversion": "10.15.6",
-        "appversion": "1.0.0",
-        }
-    request_payload = {
-        "logintokens": [logintoken],
-        "device": device_info,
-    }
-    headers = {
-        "Content-Type": "application/json"
-    }
-    try:
-        response = requests.post(url, json=request_payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().login_token_to_access_token(logintoken)
 
 
 #BUBBLE FUNCTIONS
 # Function to get all user's bubbles
 def getUsersBubbles(access_token):
-    url = f"{API_BASE_URL}api/v3/bubble.list"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",  # Ensure 'Bearer' is included
-    }
+    return get_default_client().getUsersBubbles(access_token)
 
-    try:
-        response = requests.post(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
-
-# Function to get last 50 messages in a bubble, given bubble ID 
+# Function to get last 50 messages in a bubble, given bubble ID
 # and an optional argument of latest message ID, which will return a list of 50 messages sent before that message
 def get_bubble_messages(access_token, bubbleID, latestMessageID=None):
-    url = f"{API_BASE_URL}api/v1/bubble.history"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {"bubble_id": bubbleID}
-    if latestMessageID is not None:
-        request_payload["latest"] = latestMessageID
-
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().get_bubble_messages(access_token, bubbleID, latestMessageID)
 
 #Function to get information about a bubble
 def get_bubble_info(access_token, bubbleID):
-    url = f"{API_BASE_URL}api/v2/bubble.info"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "bubble_id": bubbleID,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().get_bubble_info(access_token, bubbleID)
 
 #Function to mark a bubble as read
 def markBubble(access_token, bubbleID):
-    url = f"{API_BASE_URL}api/v1/bubble.mark"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "bubble_id": bubbleID,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().markBubble(access_token, bubbleID)
 
 #Function to create DM
 def createDM(access_token, id, orgID):
-    url = f"{API_BASE_URL}api/v1/dm.create"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "organization_id": orgID,
-        "user_id": id,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().createDM(access_token, id, orgID)
 
 #Function to create a bubble/group
 def createBubble(access_token, orgID, title, category_id):
-    url = f"{API_BASE_URL}api/v1/bubble.create"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    if category_id is not None:
-        request_payload = {
-        "organization_id": orgID,
-        "title": title,
-        "category_id": category_id,
-    }
-    else:
-        request_payload = {
-        "organization_id": orgID,
-        "title": title,
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().createBubble(access_token, orgID, title, category_id)
 
 #Function to add a member to a bubble
 #invitations is a list of user IDs, in the form of [{user_id: 5302519}, {user_id: 5302367}]
 def addMemberToBubble(access_token, bubbleID, invitations, sendemails, sendsms):
-    url = f"{API_BASE_URL}api/v1/bubble.invite"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "bubbleID": bubbleID,
-        "invitations": invitations,
-        "sendemails": sendemails,
-        "sendsms": sendsms,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().addMemberToBubble(access_token, bubbleID, invitations, sendemails, sendsms)
 
 #Function to kick user from a bubble
 #users is a list of user IDs, in the form of [5302519]
 def kickUserFromBubble(access_token, bubbleID, users):
-    url = f"{API_BASE_URL}api/v1/bubble.kick"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "bubble_id": bubbleID,
-        users: users,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().kickUserFromBubble(access_token, bubbleID, users)
 
 
 #Function to update a bubble
@@ -357,89 +613,19 @@ def kickUserFromBubble(access_token, bubbleID, users):
 #create_announcement = allow "owner" or "member" to create an announcement in the bubble
 
 def updateBubble(access_token, bubbleID, title=None, category_id=None, changetitle=None, addmember=None, leavegroup=None, create_message=None, assign_task=None, pin_message=None, changecategory=None, removemember=None, create_videosession=None, videosessionrecordcloud=None, create_announcement=None):
-    url = f"{API_BASE_URL}api/v1/bubble.update"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "bubble_id": bubbleID,
-    }
-    if title is not None:
-        request_payload["title"] = title
-    if category_id is not None:
-        request_payload["category_id"] = category_id
-    if changetitle is not None:
-        request_payload["changetitle"] = changetitle
-    if addmember is not None:
-        request_payload["addmember"] = addmember
-    if leavegroup is not None:
-        request_payload["leavegroup"] = leavegroup
-    if create_message is not None:
-        request_payload["create_message"] = create_message
-    if assign_task is not None:
-        request_payload["assign_task"] = assign_task
-    if pin_message is not None:
-        request_payload["pin_message"] = pin_message
-    if changecategory is not None:
-        request_payload["changecategory"] = changecategory
-    if removemember is not None:
-        request_payload["removemember"] = removemember
-    if create_videosession is not None:
-        request_payload["create_videosession"] = create_videosession
-    if videosessionrecordcloud is not None:
-        request_payload["videosessionrecordcloud"] = videosessionrecordcloud
-    if create_announcement is not None:
-        request_payload["create_announcement"] = create_announcement
-
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().updateBubble(
+        access_token, bubbleID, title=title, category_id=category_id, changetitle=changetitle,
+        addmember=addmember, leavegroup=leavegroup, create_message=create_message,
+        assign_task=assign_task, pin_message=pin_message, changecategory=changecategory,
+        removemember=removemember, create_videosession=create_videosession,
+        videosessionrecordcloud=videosessionrecordcloud, create_announcement=create_announcement,
+    )
 
 #Function to pin message to bubble
 #Example {bubble_id: 3955365, pinned_message_id: 96930584, pinned_message_expires_at: "2025-01-18 23:12:18"}
 # or send pinned_messageid: "null" to unpin the message
 def pinMessage(access_token, pinned_message_id, pinned_message_expires_at):
-    url = f"{API_BASE_URL}api/v1/bubble.update"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "pinned_message_id": pinned_message_id,
-        "pinned_message_expires_at": pinned_message_expires_at,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().pinMessage(access_token, pinned_message_id, pinned_message_expires_at)
 
 #Function to create invite link
 #access is the access level of the invite, expiration is the expiration date of the invite
@@ -448,354 +634,106 @@ def pinMessage(access_token, pinned_message_id, pinned_message_expires_at):
 #expiration example: expires: "2024-12-09T16:08:34.332Z"
 
 def createInvite(bubbleID, access, expires, access_token):
-    url = f"{API_BASE_URL}api/clients/groups/{bubbleID}/invites"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "access": access,
-        "expires": expires,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().createInvite(bubbleID, access, expires, access_token)
 
 
 
 #MESSAGE FUNCTIONS
 # Function to send a message to a bubble
-def send_message_to_bubble(access_token, bubbleID, created_at, message, userID, uuid, parentmessage_id):
-    url = f"{API_BASE_URL}api/v1/message.create"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    if (parentmessage_id == None):
-        request_payload = {
-        "bubble_id": bubbleID,
-        "created_at": created_at,
-        "id": "Null",
-        "message": message,
-        "messagemedia": [],
-        "user_id": userID,
-        "uuid": uuid  
-    }
-    else:
-        request_payload = {
-            "bubble_id": bubbleID,
-            "created_at": created_at,
-            "id": "Null",
-            "message": message,
-            "messagemedia": [],
-            "parentmessage_id": parentmessage_id,
-            "user_id": userID,
-            "uuid": uuid  
-        }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+#messagemedia is an optional list of attachments, such as the media returned by media.MediaTransfer.upload
+def send_message_to_bubble(access_token, bubbleID, created_at, message, userID, uuid, parentmessage_id, messagemedia=None):
+    return get_default_client().send_message_to_bubble(access_token, bubbleID, created_at, message, userID, uuid, parentmessage_id, messagemedia)
 
 # Function to add a reaction to a message
 def addReaction(access_token, messageID, reactiontype_id):
-    url = f"{API_BASE_URL}api/v1/message.addreaction"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "message_id": messageID,
-        "reactiontype_id": reactiontype_id,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().addReaction(access_token, messageID, reactiontype_id)
 
 # Function to remove a reaction from a message
 def removeReaction(access_token, messageID, reactiontype_id):
-    url = f"{API_BASE_URL}api/v1/message.removereaction"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "message_id": messageID,
-        "reactiontype_id": reactiontype_id,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().removeReaction(access_token, messageID, reactiontype_id)
 
 # Function to edit a message
 def editMessgae(access_token, newMessage, messageID):
-    url = f"{API_BASE_URL}api/v1/message.edit"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "message": newMessage,
-        "message_id": messageID,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().editMessgae(access_token, newMessage, messageID)
 
 # Function to delete a message
 def deleteMessage(access_token, messageID):
-    url = f"{API_BASE_URL}api/v1/message.delete"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "message_id": messageID,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().deleteMessage(access_token, messageID)
 
 
 #USER INFO FUNCTIONS
 # Function to get user information
 def userInfo(access_token, id):
-    url = f"{API_BASE_URL}api/v1/user.info"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "id": id,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().userInfo(access_token, id)
 
 # Function to get a user's mutual groups
 def mutualGroups(access_token, id):
-    url = f"{API_BASE_URL}api/v1/user.mutualgroups"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "id": id,
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        response_json = response.json()
-        return response_json
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().mutualGroups(access_token, id)
 
 # Function to set online/offline status
 def setStatus(access_token, userID, isonline, lastpresencetime):
-    url = f"{API_BASE_URL}api/clients/users/presence"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {  
-        "data": [
-            {
-                "user_id": userID,
-                "isonline": isonline,
-                "lastpresencetime": lastpresencetime
-            }
-        ]
-    }
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
-        
+    return get_default_client().setStatus(access_token, userID, isonline, lastpresencetime)
+
+# Function to set the status of several users in one request
+#statuses is a list in the form of [{"user_id": 5302519, "isonline": True, "lastpresencetime": "2025-01-18 23:12:18"}]
+def setStatuses(access_token, statuses):
+    return get_default_client().setStatuses(access_token, statuses)
+
 #OTHER Functions
 # Search for message function
 #EXAMPLE: {search_type: "files", size: 25, from: 0, orderby: "newest", query: "hello there", user_ids: [5302419]}
-def searchMessage(access_token, query, bubbleID=None, orderby=None, user_ids=None):
-    url = f"{API_BASE_URL}api/v1/message.search"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "search_type": "messages",
-        "size": 25,
-        "from": 0,
-        "query": query,
-    }
-    if bubbleID is not None:
-        request_payload["bubble_id"] = bubbleID
-    if orderby is not None:
-        request_payload["orderby"] = orderby
-    if user_ids is not None:
-        request_payload["user_ids"] = user_ids
-
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+#size is the number of results per page and from_ is the offset of the first result
+def searchMessage(access_token, query, bubbleID=None, orderby=None, user_ids=None, size=25, from_=0):
+    return get_default_client().searchMessage(access_token, query, bubbleID, orderby, user_ids, size, from_)
 
 #{"orderby":["firstname","lastname"],"includeself":true,"bubble_id":"3640189","page":1}
 def bubbleMembershipSearch(access_token, bubble_id, orderby=["firstname", "lastname"], includeself=True, page=None):
-    url = f"{API_BASE_URL}/api/v1/bubble.membershipsearch"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-    }
-    request_payload = {
-        "orderby": orderby,
-        "includeself": includeself,
-        "bubble_id": bubble_id,
-    }
-    if page is not None:
-        request_payload["page"] = page
-    try:
-        response = requests.post(url, headers=headers, json=request_payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.HTTPError as http_err:
-        logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
-        if response.status_code == 401:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-        else:
-            raise BackendError(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as req_err:
-        logger.error(f"Request exception occurred: {req_err}")
-        raise BackendError(f"Request exception occurred: {req_err}")
-    except Exception as err:
-        logger.error(f"An unexpected error occurred: {err}")
-        raise BackendError(f"An unexpected error occurred: {err}")
+    return get_default_client().bubbleMembershipSearch(access_token, bubble_id, orderby, includeself, page)
+
+#LAZY IMPORTS
+# The clients and tools in the sibling modules can be imported from api, e.g.
+# `from api import AsyncProntoClient, ResponseCache`, but each module is only loaded the
+# first time one of its names is used, so `import api` stays cheap for short-lived processes.
+LAZY_IMPORTS = {
+    "AsyncProntoClient": "async_api",
+    "BackfillEngine": "backfill",
+    "ResponseCache": "cache",
+    "StdlibCodec": "codec",
+    "OrjsonCodec": "codec",
+    "MsgspecCodec": "codec",
+    "ValidatorCache": "conditional",
+    "Dashboard": "dashboard",
+    "iter_bubble_messages": "history",
+    "aiter_bubble_messages": "history",
+    "MembershipSync": "membership",
+    "MetricsRegistry": "metrics",
+    "OpenTelemetrySink": "metrics",
+    "iter_search_results": "pagination",
+    "iter_bubble_members": "pagination",
+    "aiter_search_results": "pagination",
+    "aiter_bubble_members": "pagination",
+    "AdaptivePoller": "poller",
+    "TokenBucket": "ratelimit",
+    "RateLimiter": "ratelimit",
+    "RetryPolicy": "ratelimit",
+    "CircuitBreaker": "ratelimit",
+    "RealtimeClient": "realtime",
+    "SendQueue": "sendqueue",
+    "SingleFlight": "singleflight",
+    "AsyncSingleFlight": "singleflight",
+    "MessageStore": "store",
+    "TokenManager": "tokens",
+    "UserDirectory": "users",
+    "WriteBehindQueue": "writebehind",
+}
+
+def __getattr__(name):
+    module_name = LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_IMPORTS))
@@ -0,0 +1,157 @@
+import asyncio, logging, time
+import httpx
+from codec import default_codec
+from api import _ProntoEndpoints, API_BASE_URL, BackendError, CallRecord, accept_encoding, endpoint_name, payload_key, parse_retry_after
+
+# Default connection pool settings for AsyncProntoClient
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+# Default number of requests allowed in flight at once
+DEFAULT_MAX_CONCURRENCY = 100
+
+logger = logging.getLogger(__name__)
+
+#ASYNC CLIENT
+# Asyncio client exposing the same endpoint methods as ProntoClient, where every
+# method returns a coroutine. All calls share one httpx.AsyncClient connection pool,
+# and max_concurrency bounds how many requests are in flight at once so thousands of
+# awaiting tasks queue on the semaphore instead of opening thousands of sockets.
+# cache is an optional cache.ResponseCache, the same kind ProntoClient takes.
+# single_flight is an optional singleflight.AsyncSingleFlight that makes concurrent
+# identical reads share one request.
+# rate_limiter, retry_policy and circuit_breaker work as in ProntoClient, except that
+# waiting for a token or a retry sleeps the task rather than the thread.
+# codec encodes and decodes JSON bodies, see codec.py; the fastest installed one by default.
+# token_manager works as in ProntoClient; refreshing a token runs in a worker thread.
+# metrics is an optional sink that gets a CallRecord for every call, as in ProntoClient.
+# validators is an optional conditional.ValidatorCache, the same kind ProntoClient takes.
+# Responses are requested compressed with the best coding httpx can decode (zstd, br, gzip).
+#EXAMPLE:
+# async with AsyncProntoClient() as client:
+#     infos = await client.gather(client.get_bubble_info(token, b) for b in bubble_ids)
+class AsyncProntoClient(_ProntoEndpoints):
+    def __init__(self, base_url=API_BASE_URL, max_connections=DEFAULT_MAX_CONNECTIONS, max_keepalive_connections=DEFAULT_MAX_KEEPALIVE_CONNECTIONS, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=None, client=None, cache=None, single_flight=None, rate_limiter=None, retry_policy=None, circuit_breaker=None, codec=None, token_manager=None, metrics=None, validators=None):
+        self.base_url = base_url
+        self.metrics = metrics
+        self.validators = validators
+        self.token_manager = token_manager
+        self.codec = codec if codec is not None else default_codec()
+        self.cache = cache
+        self.single_flight = single_flight
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        if client is None:
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+            client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        # httpx's default Accept-Encoding lists every coding it can decode
+        client.headers["Accept-Encoding"] = accept_encoding(client.headers.get("Accept-Encoding", "gzip").split(","))
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    # Send a POST to a Pronto endpoint and return the decoded JSON body
+    async def _post(self, url, payload=None, access_token=None):
+        endpoint = endpoint_name(url)
+        if self._uses_token_manager(endpoint, access_token):
+            access_token = self.token_manager.peek_token() or await asyncio.to_thread(self.token_manager.get_token)
+            try:
+                return await self._post(url, payload, access_token)
+            except BackendError as err:
+                if err.status_code != 401:
+                    raise
+                return await self._post(url, payload, await asyncio.to_thread(self.token_manager.handle_unauthorized, access_token))
+        if self.metrics is None:
+            return await self._call(url, endpoint, payload, access_token)
+        call = CallRecord(endpoint, started_at=time.time())
+        started = time.perf_counter()
+        try:
+            return await self._call(url, endpoint, payload, access_token, call)
+        except BackendError as err:
+            call.error = str(err)
+            raise
+        finally:
+            call.latency = time.perf_counter() - started
+            self._record(call)
+
+    # Answer from the cache when it has a fresh copy, otherwise send the request
+    async def _call(self, url, endpoint, payload, access_token, call=None):
+        if self.cache is not None:
+            hit, cached = self.cache.lookup(endpoint, payload, access_token)
+            if hit:
+                if call is not None:
+                    call.cache_hit = True
+                return cached
+        if self.single_flight is not None:
+            key = (endpoint, payload_key(payload), access_token)
+            result = await self.single_flight.do(key, lambda: self._send(url, payload, access_token, call))
+            # Only the leader's record saw a response; followers were answered by it
+            if call is not None and call.status_code is None:
+                call.shared = True
+        else:
+            result = await self._send(url, payload, access_token, call)
+        if self.cache is not None:
+            self.cache.record(endpoint, payload, access_token, result)
+        return result
+
+    # Send the request under the rate limiter, retrying failures the retry policy allows
+    async def _send(self, url, payload=None, access_token=None, call=None):
+        endpoint = endpoint_name(url)
+        attempt = 0
+        while True:
+            wait = self._before_attempt(endpoint, access_token)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await self._request(url, payload, access_token, call)
+            except BackendError as err:
+                await asyncio.sleep(self._after_failure(endpoint, attempt, err))
+                attempt += 1
+                if call is not None:
+                    call.retries += 1
+                continue
+            self._after_success(endpoint)
+            return result
+
+    # Send one request over the shared connection pool
+    async def _request(self, url, payload=None, access_token=None, call=None):
+        endpoint = endpoint_name(url)
+        url, headers = self._request_parts(url, access_token)
+        entry = self._revalidating(endpoint, payload, access_token, headers)
+        response = None
+        async with self.semaphore:
+            try:
+                body = self._encode(payload)
+                if call is not None and body is not None:
+                    call.bytes_out += len(body)
+                response = await self.client.post(url, headers=headers, content=body)
+                if call is not None:
+                    call.status_code = response.status_code
+                    # Bytes as received, before decompression
+                    call.bytes_in += response.num_bytes_downloaded
+                if entry is not None and response.status_code == 304:
+                    return self.validators.not_modified(endpoint, entry)
+                response.raise_for_status()
+                return self._decode(endpoint, payload, access_token, response)
+            except httpx.HTTPStatusError as http_err:
+                logger.error(f"HTTP error occurred: {http_err} - Response: {response.text}")
+                raise BackendError(f"HTTP error occurred: {http_err}", status_code=response.status_code, retry_after=parse_retry_after(response.headers.get("Retry-After")))
+            except httpx.RequestError as req_err:
+                logger.error(f"Request exception occurred: {req_err}")
+                raise BackendError(f"Request exception occurred: {req_err}", network_error=True)
+            except Exception as err:
+                logger.error(f"An unexpected error occurred: {err}")
+                raise BackendError(f"An unexpected error occurred: {err}")
+
+    # Function to run many endpoint calls concurrently and return their results in order
+    # calls is an iterable of coroutines, such as client.userInfo(token, id) for each id
+    async def gather(self, calls, return_exceptions=False):
+        return await asyncio.gather(*calls, return_exceptions=return_exceptions)
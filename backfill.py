@@ -0,0 +1,96 @@
+import json, logging, os, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api import get_default_client
+from history import page_messages, next_cursor
+
+# Default number of bubbles backfilled at once
+DEFAULT_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+
+# Function to get bubble IDs out of a getUsersBubbles response, or pass a list of IDs through
+def bubble_ids(bubbles):
+    if isinstance(bubbles, dict):
+        bubbles = bubbles.get("bubbles") or []
+    return [bubble["id"] if isinstance(bubble, dict) else bubble for bubble in bubbles]
+
+#CHECKPOINTS
+# Per-bubble backfill progress saved as JSON, in the form of
+# {"3640189": {"cursor": 96930584, "done": false}}
+# The file is rewritten atomically after every page so an interrupted run loses at most
+# the page that was in flight.
+class Checkpoint:
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def get(self, bubbleID):
+        with self.lock:
+            return dict(self.state.get(str(bubbleID), {}))
+
+    def update(self, bubbleID, cursor=None, done=False):
+        with self.lock:
+            self.state[str(bubbleID)] = {"cursor": cursor, "done": done}
+            if self.path is not None:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self.state, f)
+                os.replace(tmp_path, self.path)
+
+#BACKFILL
+# Pulls the full history of many bubbles concurrently, one worker thread per bubble.
+# sink(bubbleID, messages) is called with every page as it arrives, from the worker
+# threads, so it must be safe to call concurrently. A page's cursor is checkpointed
+# only after the sink returns, so a resumed run may redeliver the last page but never
+# skips one.
+#EXAMPLE:
+# engine = BackfillEngine(access_token, sink=store_page, workers=16, checkpoint_path="backfill.json")
+# report = engine.run(getUsersBubbles(access_token))
+class BackfillEngine:
+    def __init__(self, access_token, sink, workers=DEFAULT_WORKERS, checkpoint_path=None, client=None):
+        self.access_token = access_token
+        self.sink = sink
+        self.workers = workers
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.client = client if client is not None else get_default_client()
+
+    # Backfill one bubble from its checkpoint, returning how many messages were delivered
+    def backfill_bubble(self, bubbleID):
+        progress = self.checkpoint.get(bubbleID)
+        if progress.get("done"):
+            return 0
+        cursor = progress.get("cursor")
+        delivered = 0
+        while True:
+            messages = page_messages(self.client.get_bubble_messages(self.access_token, bubbleID, cursor))
+            if not messages:
+                break
+            self.sink(bubbleID, messages)
+            delivered += len(messages)
+            new_cursor = next_cursor(messages)
+            if cursor is not None and new_cursor >= int(cursor):
+                break
+            cursor = new_cursor
+            self.checkpoint.update(bubbleID, cursor)
+        self.checkpoint.update(bubbleID, cursor, done=True)
+        return delivered
+
+    # Backfill every bubble, where bubbles is a getUsersBubbles response or a list of IDs
+    # Returns {"completed": {bubbleID: message count}, "failed": {bubbleID: error}}
+    def run(self, bubbles):
+        report = {"completed": {}, "failed": {}}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.backfill_bubble, bubbleID): bubbleID for bubbleID in bubble_ids(bubbles)}
+            for future in as_completed(futures):
+                bubbleID = futures[future]
+                try:
+                    report["completed"][bubbleID] = future.result()
+                # Sink errors (e.g. a failed database write) fail only their bubble, like API errors
+                except Exception as err:
+                    logger.error(f"Backfill failed for bubble {bubbleID}: {err!r}")
+                    report["failed"][bubbleID] = str(err) or repr(err)
+        return report
@@ -0,0 +1,233 @@
+import argparse, asyncio, json, logging, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from api import ProntoClient
+from async_api import AsyncProntoClient
+from backfill import BackfillEngine
+from cache import ResponseCache
+from conditional import ValidatorCache
+from mock_server import MockProntoServer
+
+# Default number of calls per scenario, and how many run at once in the concurrent ones
+DEFAULT_REQUESTS = 500
+DEFAULT_CONCURRENCY = 32
+# Default allowed slowdown against a baseline before a result counts as a regression
+DEFAULT_TOLERANCE = 0.2
+# Cold `import api` has to stay under this many milliseconds (median of fresh interpreters)
+DEFAULT_IMPORT_BUDGET = 100.0
+DEFAULT_IMPORT_RUNS = 5
+# Modules `import api` must not load; they're pulled in by the clients that need them
+LAZY_MODULES = ("requests", "urllib3", "httpx", "asyncio", "sqlite3", "websockets")
+# Script run in a fresh interpreter to time an import and list which LAZY_MODULES it loaded
+IMPORT_PROBE = """import sys, time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+print(",".join(sorted(set(sys.modules) & set({lazy!r}))))
+"""
+
+logger = logging.getLogger(__name__)
+
+# Function to get the q-quantile of a list of samples (nearest rank)
+def quantile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+# Metrics sink that keeps every call's latency, for exact percentiles, and adds up bytes received
+class LatencyRecorder:
+    def __init__(self):
+        self.latencies = []
+        self.bytes_in = 0
+
+    def record(self, call):
+        self.latencies.append(call.latency)
+        self.bytes_in += call.bytes_in
+
+# Function to summarise one scenario as {operations, seconds, throughput, p50, p99} (latencies in ms)
+def summarize(operations, seconds, latencies):
+    return {
+        "operations": operations,
+        "seconds": round(seconds, 4),
+        "throughput": round(operations / seconds, 1) if seconds else 0.0,
+        "p50": round(quantile(latencies, 0.5) * 1000, 3),
+        "p99": round(quantile(latencies, 0.99) * 1000, 3),
+    }
+
+#SCENARIOS
+# Each scenario takes the mock server and the options and returns summarize(...).
+# Throughput counts client calls per second, except backfill which counts messages.
+
+# Sequential calls on one pooled ProntoClient
+def bench_sync(server, options):
+    recorder = LatencyRecorder()
+    bubble_ids = list(server.bubbles)
+    with ProntoClient(base_url=server.url, metrics=recorder) as client:
+        started = time.perf_counter()
+        for index in range(options.requests):
+            client.get_bubble_info("bench", bubble_ids[index % len(bubble_ids)])
+        elapsed = time.perf_counter() - started
+    return summarize(options.requests, elapsed, recorder.latencies)
+
+# Concurrent calls from a thread pool sharing one ProntoClient
+def bench_sync_threads(server, options):
+    recorder = LatencyRecorder()
+    bubble_ids = list(server.bubbles)
+    with ProntoClient(base_url=server.url, pool_maxsize=options.concurrency, metrics=recorder) as client:
+        with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+            started = time.perf_counter()
+            list(executor.map(lambda index: client.get_bubble_info("bench", bubble_ids[index % len(bubble_ids)]), range(options.requests)))
+            elapsed = time.perf_counter() - started
+    return summarize(options.requests, elapsed, recorder.latencies)
+
+# Concurrent calls on one AsyncProntoClient
+def bench_async(server, options):
+    recorder = LatencyRecorder()
+    bubble_ids = list(server.bubbles)
+
+    async def run():
+        async with AsyncProntoClient(base_url=server.url, max_concurrency=options.concurrency, metrics=recorder) as client:
+            started = time.perf_counter()
+            await client.gather(client.get_bubble_info("bench", bubble_ids[index % len(bubble_ids)]) for index in range(options.requests))
+            return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    return summarize(options.requests, elapsed, recorder.latencies)
+
+# Repeated user.info lookups over a small set of users, answered mostly by the ResponseCache
+def bench_cache(server, options):
+    recorder = LatencyRecorder()
+    cache = ResponseCache()
+    user_ids = list(server.users)[:10]
+    with ProntoClient(base_url=server.url, cache=cache, metrics=recorder) as client:
+        started = time.perf_counter()
+        for index in range(options.requests):
+            client.userInfo("bench", user_ids[index % len(user_ids)])
+        elapsed = time.perf_counter() - started
+    result = summarize(options.requests, elapsed, recorder.latencies)
+    result["hit_rate"] = round(cache.stats()["user.info"]["hit_rate"], 3)
+    return result
+
+# Repeated bubble.list calls sent as conditional requests, answered 304 while unchanged
+def bench_revalidate(server, options):
+    recorder = LatencyRecorder()
+    validators = ValidatorCache()
+    with ProntoClient(base_url=server.url, validators=validators, metrics=recorder) as client:
+        started = time.perf_counter()
+        for _ in range(options.requests):
+            client.getUsersBubbles("bench")
+        elapsed = time.perf_counter() - started
+    result = summarize(options.requests, elapsed, recorder.latencies)
+    result["hit_rate"] = round(validators.stats()["bubble.list"]["hit_rate"], 3)
+    result["bytes_per_call"] = round(recorder.bytes_in / options.requests, 1)
+    return result
+
+# Full-history backfill of every bubble through BackfillEngine
+def bench_backfill(server, options):
+    recorder = LatencyRecorder()
+    with ProntoClient(base_url=server.url, pool_maxsize=options.concurrency, metrics=recorder) as client:
+        engine = BackfillEngine("bench", sink=lambda bubbleID, messages: None, workers=min(options.concurrency, len(server.bubbles)), client=client)
+        started = time.perf_counter()
+        report = engine.run(list(server.bubbles))
+        elapsed = time.perf_counter() - started
+    return summarize(sum(report["completed"].values()), elapsed, recorder.latencies)
+
+# Function to time a cold import of module in fresh interpreters
+# Returns (seconds per run, LAZY_MODULES that the import loaded)
+def measure_import(module="api", runs=DEFAULT_IMPORT_RUNS):
+    probe = IMPORT_PROBE.format(module=module, lazy=LAZY_MODULES)
+    samples, loaded = [], set()
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", probe], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.splitlines()
+        samples.append(float(output[0]))
+        if len(output) > 1:
+            loaded.update(name for name in output[1].split(",") if name)
+    return samples, sorted(loaded)
+
+# Cold start: `import api` in a fresh interpreter, checked against --import-budget
+def bench_import(server, options):
+    samples, loaded = measure_import(runs=options.import_runs)
+    result = summarize(len(samples), sum(samples), samples)
+    result["loaded"] = loaded
+    return result
+
+SCENARIOS = {
+    "sync": bench_sync,
+    "sync_threads": bench_sync_threads,
+    "async": bench_async,
+    "cache": bench_cache,
+    "revalidate": bench_revalidate,
+    "backfill": bench_backfill,
+    "import": bench_import,
+}
+
+# Function to compare results with a baseline, returning a list of regression descriptions
+# A scenario regresses if its throughput drops, or its p99 grows, by more than tolerance
+def find_regressions(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']}/s vs baseline {previous['throughput']}/s")
+        if result["p99"] > previous["p99"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {result['p99']}ms vs baseline {previous['p99']}ms")
+    return regressions
+
+# Function to check the import scenario against the budget, returning a list of violations
+def check_import_budget(result, budget=DEFAULT_IMPORT_BUDGET):
+    violations = []
+    if result["p50"] > budget:
+        violations.append(f"import: {result['p50']}ms is over the {budget}ms budget")
+    if result["loaded"]:
+        violations.append(f"import: api loaded {', '.join(result['loaded'])} eagerly")
+    return violations
+
+# Function to run the chosen scenarios against a fresh mock server each and return their results
+def run_benchmarks(options):
+    results = {}
+    for name in options.scenarios:
+        with MockProntoServer(latency=options.latency, jitter=options.jitter) as server:
+            results[name] = SCENARIOS[name](server, options)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Pronto clients against a local mock server")
+    parser.add_argument("scenarios", nargs="*", default=list(SCENARIOS), help=f"scenarios to run, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of server latency per request")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--save", help="write the results to this JSON file, e.g. to use as a baseline")
+    parser.add_argument("--baseline", help="JSON file from --save to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--import-budget", type=float, default=DEFAULT_IMPORT_BUDGET, help="milliseconds allowed for a cold `import api`")
+    parser.add_argument("--import-runs", type=int, default=DEFAULT_IMPORT_RUNS)
+    options = parser.parse_args(argv)
+    unknown = [name for name in options.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = run_benchmarks(options)
+    print(f"{'scenario':<14}{'ops':>8}{'ops/s':>12}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<14}{result['operations']:>8}{result['throughput']:>12}{result['p50']:>10}{result['p99']:>10}")
+    failed = False
+    if "import" in results:
+        for violation in check_import_budget(results["import"], options.import_budget):
+            print(f"BUDGET {violation}")
+            failed = True
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if options.baseline:
+        with open(options.baseline) as f:
+            regressions = find_regressions(results, json.load(f), options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
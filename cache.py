@@ -0,0 +1,146 @@
+import threading, time
+from collections import OrderedDict
+from api import payload_key
+
+# Default time to live in seconds for each cached endpoint
+DEFAULT_TTLS = {
+    "user.info": 300,
+    "bubble.info": 60,
+    "user.mutualgroups": 300,
+}
+DEFAULT_MAXSIZE = 4096
+
+#INVALIDATION HOOKS
+# Each hook takes the payload of a successful write and returns the cached entries it
+# makes stale, as a list of (endpoint, fields) where fields must match the cached payload.
+# fields=None drops every entry for that endpoint.
+def _bubble_write(bubble_key):
+    def hook(payload):
+        return [("bubble.info", {"bubble_id": payload.get(bubble_key)})]
+    return hook
+
+# Invited or kicked users' mutual groups change along with the bubble's members
+def _membership_write(users_key):
+    def hook(payload):
+        stale = []
+        for user in payload.get(users_key) or []:
+            user_id = user.get("user_id") if isinstance(user, dict) else user
+            if user_id is not None:
+                stale.append(("user.mutualgroups", {"id": user_id}))
+        return stale
+    return hook
+
+def _presence_write(payload):
+    return [("user.info", {"id": entry.get("user_id")}) for entry in payload.get("data", [])]
+
+DEFAULT_INVALIDATION_HOOKS = {
+    "bubble.update": [_bubble_write("bubble_id")],
+    "bubble.invite": [_bubble_write("bubbleID"), _membership_write("invitations")],
+    "bubble.kick": [_bubble_write("bubble_id"), _membership_write("users")],
+    "presence": [_presence_write],
+}
+
+# Per-endpoint hit and miss counts, shared by ResponseCache and conditional.ValidatorCache
+class HitCounter:
+    def __init__(self):
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def hit(self, endpoint):
+        self._count(endpoint, "hits")
+
+    def miss(self, endpoint):
+        self._count(endpoint, "misses")
+
+    def _count(self, endpoint, field):
+        with self.lock:
+            counter = self.counters.setdefault(endpoint, {"hits": 0, "misses": 0})
+            counter[field] += 1
+
+    # Returns hit/miss counts and hit rate per endpoint
+    def stats(self):
+        with self.lock:
+            report = {}
+            for endpoint, counter in self.counters.items():
+                total = counter["hits"] + counter["misses"]
+                report[endpoint] = dict(counter, hit_rate=counter["hits"] / total if total else 0.0)
+            return report
+
+#CACHE
+# In-process LRU cache with per-endpoint TTLs for read-mostly endpoints.
+# Pass one to ProntoClient(cache=...) or AsyncProntoClient(cache=...); any object with
+# the same lookup/record methods can be plugged in instead.
+# Entries are keyed by endpoint, payload and access token, and cached responses are
+# returned as-is, so callers should treat them as read-only.
+#EXAMPLE:
+# cache = ResponseCache(ttls={"user.info": 600, "bubble.info": 30})
+# client = ProntoClient(cache=cache)
+# cache.stats()  ->  {"user.info": {"hits": 120, "misses": 4, "hit_rate": 0.97}, ...}
+class ResponseCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttls=None, invalidate_on_write=True):
+        self.maxsize = maxsize
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.hooks = {endpoint: list(hooks) for endpoint, hooks in DEFAULT_INVALIDATION_HOOKS.items()} if invalidate_on_write else {}
+        self.entries = OrderedDict()
+        self.counter = HitCounter()
+        self.lock = threading.Lock()
+
+    # Register an extra invalidation hook that runs after a successful write to endpoint
+    def add_invalidation_hook(self, endpoint, hook):
+        self.hooks.setdefault(endpoint, []).append(hook)
+
+    # Returns (True, response) on a fresh hit, otherwise (False, None)
+    def lookup(self, endpoint, payload, access_token):
+        if endpoint not in self.ttls:
+            return False, None
+        key = (endpoint, payload_key(payload), access_token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.counter.hit(endpoint)
+                return True, entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.counter.miss(endpoint)
+            return False, None
+
+    # Returns the fresh cached response, or None, without counting a hit or miss
+    def peek(self, endpoint, payload, access_token):
+        key = (endpoint, payload_key(payload), access_token)
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry[1] if entry is not None and entry[0] > time.monotonic() else None
+
+    # Store a successful response, and drop entries made stale by it if it was a write
+    def record(self, endpoint, payload, access_token, response):
+        ttl = self.ttls.get(endpoint)
+        if ttl is not None:
+            key = (endpoint, payload_key(payload), access_token)
+            with self.lock:
+                self.entries[key] = (time.monotonic() + ttl, response, payload)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        for hook in self.hooks.get(endpoint, []):
+            for stale_endpoint, fields in hook(payload or {}):
+                self.invalidate(stale_endpoint, fields)
+
+    # Drop cached entries for endpoint whose payload matches every field in fields
+    def invalidate(self, endpoint=None, fields=None):
+        with self.lock:
+            for key in list(self.entries):
+                if endpoint is not None and key[0] != endpoint:
+                    continue
+                cached_payload = self.entries[key][2] or {}
+                if fields and any(str(cached_payload.get(name)) != str(value) for name, value in fields.items()):
+                    continue
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    # Returns hit/miss counts and hit rate per endpoint
+    def stats(self):
+        return self.counter.stats()
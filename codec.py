@@ -0,0 +1,62 @@
+import json
+
+#JSON CODECS
+# Encode request bodies and decode response bodies for ProntoClient and AsyncProntoClient.
+# dumps(obj) returns bytes and loads(data) takes bytes. default_codec() picks the fastest
+# library installed: orjson, then msgspec, then the stdlib json module.
+#EXAMPLE:
+# client = ProntoClient(codec=OrjsonCodec())
+# bubbles = models.parse_bubbles(client.getUsersBubbles(access_token))
+
+class StdlibCodec:
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+
+    def dumps(self, obj):
+        return self._dumps(obj)
+
+    def loads(self, data):
+        return self._loads(data)
+
+class MsgspecCodec:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+_default_codec = None
+
+# Function to get the fastest codec available, chosen once per process
+def default_codec():
+    global _default_codec
+    if _default_codec is None:
+        for codec_class in (OrjsonCodec, MsgspecCodec):
+            try:
+                _default_codec = codec_class()
+                break
+            except ImportError:
+                continue
+        else:
+            _default_codec = StdlibCodec()
+    return _default_codec
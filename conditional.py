@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from api import READ_ENDPOINTS, payload_key
+from cache import DEFAULT_MAXSIZE, HitCounter
+
+# The validators and decoded body of one response
+@dataclass(slots=True)
+class Validated:
+    etag: Optional[str]
+    last_modified: Optional[str]
+    response: object
+
+    # Request headers that ask the server to answer 304 if the response is unchanged
+    def headers(self):
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+#VALIDATOR CACHE
+# Keeps the ETag and Last-Modified of read responses, keyed by endpoint, payload and
+# access token, so repeated reads are sent as conditional requests. When the server
+# answers 304 Not Modified the client returns the body decoded the first time, so an
+# unchanged bubble.list costs a few header bytes and no JSON parsing.
+# Pass one to ProntoClient(validators=...) or AsyncProntoClient(validators=...). Unlike
+# ResponseCache nothing expires: every call still asks the server, which decides whether
+# the stored body is current, so writes need no invalidation. Both can be used together,
+# with ResponseCache answering within its TTLs and validators revalidating after them.
+# Responses are returned as-is, so callers should treat them as read-only.
+#EXAMPLE:
+# client = ProntoClient(validators=ValidatorCache())
+# client.getUsersBubbles(access_token)  # 200, body stored with its ETag
+# client.getUsersBubbles(access_token)  # 304, stored body returned
+class ValidatorCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, endpoints=READ_ENDPOINTS):
+        self.maxsize = maxsize
+        self.endpoints = frozenset(endpoints)
+        self.entries = OrderedDict()
+        self.counter = HitCounter()
+        self.lock = threading.Lock()
+
+    # Returns the stored Validated for a call, or None if it can't be sent conditionally
+    def lookup(self, endpoint, payload, access_token):
+        if endpoint not in self.endpoints:
+            return None
+        key = (endpoint, payload_key(payload), access_token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    # Count a 304 for entry and return its stored body
+    def not_modified(self, endpoint, entry):
+        self.counter.hit(endpoint)
+        return entry.response
+
+    # Store a full response with its validators, taken from the response headers
+    # A response without validators drops the old entry so it is never revalidated
+    def record(self, endpoint, payload, access_token, headers, response):
+        if endpoint not in self.endpoints:
+            return
+        key = (endpoint, payload_key(payload), access_token)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        self.counter.miss(endpoint)
+        with self.lock:
+            if etag is None and last_modified is None:
+                self.entries.pop(key, None)
+                return
+            self.entries[key] = Validated(etag, last_modified, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    # Returns 304 (hits) and full response (misses) counts and hit rate per endpoint
+    def stats(self):
+        return self.counter.stats()
@@ -0,0 +1,144 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from api import BackendError, get_default_client
+from history import page_messages
+from poller import unread_count
+
+# Default number of bubble.info / bubble.history calls made at once
+DEFAULT_WORKERS = 16
+# bubble.list fields a view needs; bubble.info is only fetched for entries missing one
+DEFAULT_INFO_FIELDS = ("title", "memberscount")
+# Keys a bubble.list entry may carry its latest message under
+LAST_MESSAGE_KEYS = ("lastmessage", "last_message", "latestmessage")
+
+logger = logging.getLogger(__name__)
+
+# Function to get the newest message out of a bubble.history page, or None if it's empty
+def latest_message(page):
+    return max(page_messages(page), key=lambda message: int(message["id"]), default=None)
+
+# Function to get the latest message embedded in a bubble.list entry, or None
+def embedded_last_message(bubble):
+    for key in LAST_MESSAGE_KEYS:
+        if isinstance(bubble.get(key), dict):
+            return bubble[key]
+    return None
+
+# One bubble as shown on the dashboard
+# bubble is the bubble.list entry, merged with bubble.info if that had to be fetched
+@dataclass(slots=True)
+class BubbleView:
+    id: object
+    bubble: dict
+    last_message: Optional[dict] = None
+    unread: int = 0
+    # What the bubble.list entry looked like when this view was built, to spot changes
+    version: tuple = ()
+
+#DASHBOARD
+# Assembles every bubble's info, latest message and unread count from one bubble.list
+# call plus only the dependent calls it can't avoid, made concurrently:
+# - bubble.info only for entries missing one of info_fields
+# - bubble.history only for bubbles whose entry has no embedded latest message
+# Between snapshots, a bubble whose bubble.list entry is unchanged (same updated_at,
+# unread count and latest message) reuses its previous view without any calls.
+# If a dependent call fails, the view falls back to the previous or partial data.
+#EXAMPLE:
+# dashboard = Dashboard(access_token)
+# for view in dashboard.snapshot():
+#     render(view.bubble["title"], view.last_message, view.unread)
+class Dashboard:
+    def __init__(self, access_token, client=None, workers=DEFAULT_WORKERS, info_fields=DEFAULT_INFO_FIELDS):
+        self.access_token = access_token
+        self.client = client if client is not None else get_default_client()
+        self.workers = workers
+        self.info_fields = info_fields
+        self.views = {}
+
+    def _version(self, bubble):
+        last = embedded_last_message(bubble)
+        return (bubble.get("updated_at"), unread_count(bubble), last.get("id") if last else None)
+
+    # Decide what a bubble.list entry still needs: returns (view, needs_info, needs_history)
+    # view is the reused previous view when nothing changed
+    def _plan(self, bubble):
+        version = self._version(bubble)
+        previous = self.views.get(bubble["id"])
+        if previous is not None and version == previous.version and any(version):
+            return previous, False, False
+        view = BubbleView(bubble["id"], bubble, embedded_last_message(bubble), unread_count(bubble), version)
+        needs_info = any(field not in bubble for field in self.info_fields)
+        return view, needs_info, view.last_message is None
+
+    def _fill(self, view, info=None, history=None):
+        if info is not None:
+            view.bubble = {**view.bubble, **info.get("bubble", info)}
+        if history is not None:
+            view.last_message = latest_message(history)
+
+    # Fall back to what the previous snapshot knew when a dependent call failed
+    def _fallback(self, view, what, err):
+        logger.error(f"Fetching {what} for bubble {view.id} failed: {err}")
+        previous = self.views.get(view.id)
+        if previous is not None:
+            if what == "bubble.info":
+                view.bubble = {**previous.bubble, **view.bubble}
+            elif view.last_message is None:
+                view.last_message = previous.last_message
+        # Don't let a partial view be reused as if it were complete
+        view.version = ()
+
+    # List the dependent calls still needed, as (view, endpoint) pairs
+    def _calls(self, plans):
+        calls = []
+        for view, needs_info, needs_history in plans:
+            if needs_info:
+                calls.append((view, "bubble.info"))
+            if needs_history:
+                calls.append((view, "bubble.history"))
+        return calls
+
+    def _fetch(self, call):
+        view, what = call
+        try:
+            if what == "bubble.info":
+                self._fill(view, info=self.client.get_bubble_info(self.access_token, view.id))
+            else:
+                self._fill(view, history=self.client.get_bubble_messages(self.access_token, view.id))
+        except BackendError as err:
+            self._fallback(view, what, err)
+
+    def _finish(self, views):
+        self.views = {view.id: view for view in views}
+        return views
+
+    # Returns a BubbleView for every bubble, in bubble.list order
+    # bubbles is a getUsersBubbles response to build from, fetched if not given
+    def snapshot(self, bubbles=None):
+        bubbles = bubbles if bubbles is not None else self.client.getUsersBubbles(self.access_token)
+        plans = [self._plan(bubble) for bubble in bubbles.get("bubbles") or []]
+        calls = self._calls(plans)
+        if calls:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(calls))) as executor:
+                list(executor.map(self._fetch, calls))
+        return self._finish([plan[0] for plan in plans])
+
+    # Async counterpart of snapshot, fetching through an AsyncProntoClient
+    async def asnapshot(self, client, bubbles=None):
+        bubbles = bubbles if bubbles is not None else await client.getUsersBubbles(self.access_token)
+        plans = [self._plan(bubble) for bubble in bubbles.get("bubbles") or []]
+        calls = self._calls(plans)
+        requests = [client.get_bubble_info(self.access_token, view.id) if what == "bubble.info" else client.get_bubble_messages(self.access_token, view.id) for view, what in calls]
+        results = await client.gather(requests, return_exceptions=True)
+        for (view, what), result in zip(calls, results):
+            if isinstance(result, BackendError):
+                self._fallback(view, what, result)
+            elif isinstance(result, BaseException):
+                raise result
+            elif what == "bubble.info":
+                self._fill(view, info=result)
+            else:
+                self._fill(view, history=result)
+        return self._finish([plan[0] for plan in plans])
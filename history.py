@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from api import get_default_client
+
+#HISTORY ITERATORS
+# Walk a bubble's full history by following the bubble.history "latest" cursor.
+# Messages are yielded one at a time and at most two pages (the current one and the
+# prefetched next one) are held in memory, however long the history is.
+#
+# latestMessageID starts the walk before that message instead of at the newest one
+# stop_at_id stops the walk at that message ID, which is not yielded
+# since stops the walk at messages created before it, as a datetime or a string
+# such as "2025-01-18 23:12:18"; times without a timezone, like Pronto's, are taken as UTC
+# prefetch=True fetches the next page while the caller is still processing the current one
+
+# Function to get the message list out of a bubble.history response
+def page_messages(page):
+    return page.get("messages") or []
+
+# Function to get the cursor for the page before this one, the oldest message ID in it
+def next_cursor(messages):
+    return min(int(message["id"]) for message in messages)
+
+def _parse_time(value):
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+# Guards against a server that keeps returning the same page for a cursor
+def _advanced(cursor, latestMessageID):
+    return latestMessageID is None or cursor < int(latestMessageID)
+
+# Stop condition shared by the sync and async iterators
+class _StopCondition:
+    def __init__(self, stop_at_id=None, since=None):
+        self.stop_at_id = int(stop_at_id) if stop_at_id is not None else None
+        self.since = _parse_time(since) if since is not None else None
+        self.reached = False
+
+    # Returns True if the message is past the stop point, and remembers it so paging stops
+    def past(self, message):
+        if self.stop_at_id is not None and int(message["id"]) <= self.stop_at_id:
+            self.reached = True
+        elif self.since is not None and message.get("created_at") is not None and _parse_time(message["created_at"]) < self.since:
+            self.reached = True
+        else:
+            return False
+        return True
+
+# Generator over every message in a bubble, newest pages first
+def iter_bubble_messages(access_token, bubbleID, latestMessageID=None, stop_at_id=None, since=None, prefetch=False, client=None):
+    client = client if client is not None else get_default_client()
+    stop = _StopCondition(stop_at_id, since)
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        page = client.get_bubble_messages(access_token, bubbleID, latestMessageID)
+        while True:
+            messages = page_messages(page)
+            if not messages:
+                return
+            cursor = next_cursor(messages)
+            pending = None
+            if executor is not None and (stop.stop_at_id is None or cursor > stop.stop_at_id):
+                pending = executor.submit(client.get_bubble_messages, access_token, bubbleID, cursor)
+            for message in messages:
+                if not stop.past(message):
+                    yield message
+            del messages, page
+            if stop.reached or not _advanced(cursor, latestMessageID):
+                if pending is not None:
+                    pending.cancel()
+                return
+            latestMessageID = cursor
+            page = pending.result() if pending is not None else client.get_bubble_messages(access_token, bubbleID, cursor)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Async generator over every message in a bubble, for use with AsyncProntoClient
+async def aiter_bubble_messages(client, access_token, bubbleID, latestMessageID=None, stop_at_id=None, since=None, prefetch=False):
+    # Imported here so the sync iterator doesn't pay for asyncio
+    import asyncio
+    stop = _StopCondition(stop_at_id, since)
+    pending = None
+    try:
+        page = await client.get_bubble_messages(access_token, bubbleID, latestMessageID)
+        while True:
+            messages = page_messages(page)
+            if not messages:
+                return
+            cursor = next_cursor(messages)
+            if prefetch and (stop.stop_at_id is None or cursor > stop.stop_at_id):
+                pending = asyncio.ensure_future(client.get_bubble_messages(access_token, bubbleID, cursor))
+            for message in messages:
+                if not stop.past(message):
+                    yield message
+            del messages, page
+            if stop.reached or not _advanced(cursor, latestMessageID):
+                return
+            latestMessageID = cursor
+            if pending is not None:
+                page, pending = await pending, None
+            else:
+                page = await client.get_bubble_messages(access_token, bubbleID, cursor)
+    finally:
+        if pending is not None:
+            pending.cancel()
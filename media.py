@@ -0,0 +1,292 @@
+import json, logging, mmap, os, stat, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from api import BackendError, CallRecord, endpoint_name, get_default_client, parse_retry_after, wire_size
+
+# Default size of each uploaded part, and of each chunk written while downloading
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Default number of parts uploaded at once
+DEFAULT_WORKERS = 4
+# Default number of passes over the missing parts before an upload gives up
+DEFAULT_MAX_ROUNDS = 3
+# Endpoints of the multipart upload flow. The repo has no record of Pronto's upload API,
+# so these are overridable per MediaTransfer, as realtime.py does for its auth endpoint:
+#   start     {"filename", "mimetype", "size", "part_size"} -> {"upload_id"}
+#   part      PUT raw bytes to ?upload_id=...&part=N (parts counted from 0)
+#   status    {"upload_id"} -> {"parts": [part numbers received]}
+#   complete  {"upload_id", "parts", "size"} -> {"media": messagemedia entry}
+DEFAULT_UPLOAD_ENDPOINTS = {
+    "start": "api/v1/file.upload.start",
+    "part": "api/v1/file.upload.part",
+    "status": "api/v1/file.upload.status",
+    "complete": "api/v1/file.upload.complete",
+}
+
+logger = logging.getLogger(__name__)
+
+# Function to tell whether url is relative or on the same scheme, host and port as base_url
+def same_origin(url, base_url):
+    if not url.startswith("http"):
+        return True
+    target, base = urlsplit(url), urlsplit(base_url)
+    return (target.scheme, target.netloc) == (base.scheme, base.netloc)
+
+# Function to open an upload source as (buffer, size, close) so parts can be sliced out
+# of it without copying. Paths and real files are memory-mapped, and bytes-like objects
+# and BytesIO are used in place. Returns None for streams that can only be read in order.
+def open_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source)
+        return view, view.nbytes, view.release
+    if isinstance(source, (str, os.PathLike)):
+        f = open(source, "rb")
+        try:
+            return _map_file(f, f.close)
+        except (OSError, ValueError):
+            f.close()
+            raise
+    if hasattr(source, "getbuffer"):
+        view = source.getbuffer()
+        return view, view.nbytes, view.release
+    try:
+        if not stat.S_ISREG(os.fstat(source.fileno()).st_mode):
+            return None
+    except (AttributeError, OSError, ValueError):
+        return None
+    return _map_file(source, lambda: None)
+
+def _map_file(f, close_file):
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        close_file()
+        return memoryview(b""), 0, lambda: None
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    def close():
+        view.release()
+        mapped.close()
+        close_file()
+    return view, size, close
+
+#MEDIA TRANSFER
+# Streams message attachments to and from Pronto without holding whole files in memory.
+# upload() sends a file in part_size parts, `workers` at a time, straight out of a memory
+# map (or, for pipes and other one-way streams, one buffered part per worker). Failed
+# parts are retried from the server's list of received parts, and with checkpoint_path
+# an interrupted upload resumes in a later run, sending only the missing parts.
+# The returned media dict goes into messagemedia, and can be reused for every bubble
+# the file is shared with. download() streams to a path or file object in chunks, and
+# resumes a partial download of a path with an HTTP Range request.
+# client must be a ProntoClient, whose session and timeout are used for the raw transfers.
+#EXAMPLE:
+# media = MediaTransfer(access_token).upload("lecture.mp4", checkpoint_path="lecture.upload")
+# for bubbleID in bubble_ids:
+#     send_queue.enqueue(bubbleID, "Today's lecture", messagemedia=[media])
+class MediaTransfer:
+    def __init__(self, access_token, client=None, part_size=DEFAULT_PART_SIZE, workers=DEFAULT_WORKERS, max_rounds=DEFAULT_MAX_ROUNDS, endpoints=None):
+        self.access_token = access_token
+        self.client = client if client is not None else get_default_client()
+        self.part_size = part_size
+        self.workers = workers
+        self.max_rounds = max_rounds
+        self.endpoints = dict(DEFAULT_UPLOAD_ENDPOINTS, **(endpoints or {}))
+
+    # Make one raw request through the client's session, mapping failures to BackendError
+    # With consume, the body is streamed: consume(response) reads it and its result is
+    # returned. The call is reported to the client's metrics sink like any other, once the
+    # body has been read.
+    def _raw(self, method, url, endpoint, data=None, headers=None, consume=None):
+        import requests
+        # Media URLs on other hosts (CDNs, presigned storage) never get the access token
+        access_token = self.access_token if same_origin(url, self.client.base_url) else None
+        url, request_headers = self.client._request_parts(url, access_token)
+        request_headers.update(headers or {})
+        call = CallRecord(endpoint, started_at=time.time()) if self.client.metrics is not None else None
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.client.session.request(method, url, data=data, headers=request_headers, stream=consume is not None, timeout=self.client.timeout)
+            if call is not None:
+                call.status_code = response.status_code
+                call.bytes_out = len(data) if data is not None else 0
+            response.raise_for_status()
+            if consume is None:
+                if call is not None:
+                    call.bytes_in = wire_size(response)
+                return response
+            with response:
+                result = consume(response)
+                if call is not None:
+                    call.bytes_in = response.raw.tell()
+            return result
+        except requests.exceptions.HTTPError as http_err:
+            if call is not None:
+                call.error = str(http_err)
+            raise BackendError(f"HTTP error occurred: {http_err}", status_code=response.status_code, retry_after=parse_retry_after(response.headers.get("Retry-After")))
+        except requests.exceptions.RequestException as req_err:
+            if call is not None:
+                call.error = str(req_err)
+            raise BackendError(f"Request exception occurred: {req_err}", network_error=True)
+        finally:
+            if call is not None:
+                call.latency = time.perf_counter() - started
+                self.client._record(call)
+
+    def _send_part(self, upload_id, part, data):
+        url = f"{self.endpoints['part']}?upload_id={upload_id}&part={part}"
+        try:
+            response = self._raw("PUT", url, endpoint_name(self.endpoints["part"]), data=data, headers={"Content-Type": "application/octet-stream"})
+            response.close()
+        except BackendError as err:
+            logger.warning(f"Upload {upload_id} part {part} failed: {err}")
+            return False
+        finally:
+            if isinstance(data, memoryview):
+                data.release()
+        return True
+
+    def _received_parts(self, upload_id):
+        return set(self.client._post(self.endpoints["status"], {"upload_id": upload_id}, self.access_token).get("parts") or [])
+
+    # Upload a path, file object or bytes-like object and return its messagemedia entry
+    # filename defaults to the path's name; with checkpoint_path, the upload ID is kept
+    # there until the upload completes so a failed or interrupted upload can be resumed
+    def upload(self, source, filename=None, mimetype="application/octet-stream", checkpoint_path=None):
+        if filename is None:
+            name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", None)
+            filename = os.path.basename(os.fspath(name)) if isinstance(name, (str, os.PathLike)) else "file"
+        opened = open_source(source)
+        if opened is None:
+            return self._upload_stream(source, filename, mimetype)
+        view, size, close = opened
+        try:
+            part_count = max(1, -(-size // self.part_size))
+            upload_id, received = self._resume(checkpoint_path, size)
+            if upload_id is None:
+                upload_id = self._start(filename, mimetype, size)
+                self._save_checkpoint(checkpoint_path, {"upload_id": upload_id, "size": size, "part_size": self.part_size})
+            for _ in range(self.max_rounds):
+                missing = [part for part in range(part_count) if part not in received]
+                if not missing:
+                    break
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as executor:
+                    list(executor.map(lambda part: self._send_part(upload_id, part, view[part * self.part_size:(part + 1) * self.part_size]), missing))
+                received = self._received_parts(upload_id)
+            else:
+                if any(part not in received for part in range(part_count)):
+                    raise BackendError(f"Upload {upload_id} is missing parts after {self.max_rounds} rounds; upload again with the same checkpoint_path to resume")
+            media = self._complete(upload_id, part_count, size)
+        finally:
+            close()
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        return media
+
+    # Upload a stream that can only be read once, in order. At most `workers` parts are
+    # buffered at a time, and a part that still fails after retries fails the upload.
+    def _upload_stream(self, source, filename, mimetype):
+        upload_id = self._start(filename, mimetype, None)
+        slots = threading.BoundedSemaphore(self.workers)
+        failed = []
+        size = 0
+        part = 0
+
+        def send(part, data):
+            try:
+                for _ in range(self.max_rounds):
+                    if self._send_part(upload_id, part, memoryview(data)):
+                        return
+                failed.append(part)
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not failed:
+                data = bytearray(self.part_size)
+                length = source.readinto(data) if hasattr(source, "readinto") else _read_into(source, data)
+                if not length and part > 0:
+                    break
+                slots.acquire()
+                executor.submit(send, part, data[:length] if length < self.part_size else data)
+                size += length
+                part += 1
+                if length < self.part_size:
+                    break
+        if failed:
+            raise BackendError(f"Upload {upload_id} failed on parts {sorted(failed)}")
+        return self._complete(upload_id, part, size)
+
+    def _start(self, filename, mimetype, size):
+        response = self.client._post(self.endpoints["start"], {"filename": filename, "mimetype": mimetype, "size": size, "part_size": self.part_size}, self.access_token)
+        return response["upload_id"]
+
+    def _complete(self, upload_id, part_count, size):
+        response = self.client._post(self.endpoints["complete"], {"upload_id": upload_id, "parts": part_count, "size": size}, self.access_token)
+        return response.get("media", response)
+
+    # Returns (upload ID, parts the server has) for an upload to resume, or (None, empty set)
+    def _resume(self, checkpoint_path, size):
+        if checkpoint_path is None or not os.path.exists(checkpoint_path):
+            return None, set()
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if state.get("size") != size or state.get("part_size") != self.part_size:
+            return None, set()
+        try:
+            return state["upload_id"], self._received_parts(state["upload_id"])
+        except BackendError as err:
+            logger.warning(f"Can't resume upload {state['upload_id']}, starting over: {err}")
+            return None, set()
+
+    def _save_checkpoint(self, checkpoint_path, state):
+        if checkpoint_path is not None:
+            tmp_path = f"{checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, checkpoint_path)
+
+    # Download url (a media URL, or a path relative to the client's base_url) to dest, a
+    # path or a writable file object, returning the number of bytes written. A path is
+    # written through dest + ".part" and renamed when complete; if a .part file is left
+    # over from an interrupted download, only the rest is requested. The access token is
+    # only sent when url is on the client's own origin.
+    def download(self, url, dest, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE):
+        if not isinstance(dest, (str, os.PathLike)):
+            return self._raw("GET", url, "media.download", consume=lambda response: _copy(response, dest, chunk_size))
+        part_path = f"{os.fspath(dest)}.part"
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        # Ask for the bytes as stored, so Range offsets match what is on disk
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        # Returns (bytes written, whether the .part file was appended to)
+        def write(response):
+            resumed = response.status_code == 206
+            with open(part_path, "ab" if resumed else "wb") as f:
+                return _copy(response, f, chunk_size), resumed
+
+        try:
+            written, resumed = self._raw("GET", url, "media.download", headers=headers, consume=write)
+        except BackendError as err:
+            # 416: the .part file already holds everything
+            if err.status_code != 416:
+                raise
+            os.replace(part_path, dest)
+            return offset
+        os.replace(part_path, dest)
+        return written + (offset if resumed else 0)
+
+def _read_into(source, buffer):
+    data = source.read(len(buffer))
+    buffer[:len(data)] = data
+    return len(data)
+
+def _copy(response, f, chunk_size):
+    written = 0
+    for chunk in response.iter_content(chunk_size):
+        f.write(chunk)
+        written += len(chunk)
+    return written
@@ -0,0 +1,127 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+from api import BackendError, get_default_client
+from models import Membership
+from pagination import iter_bubble_members
+
+# Default number of membership calls made at once
+DEFAULT_WORKERS = 16
+# Most users put in one bubble.invite or bubble.kick call
+DEFAULT_BATCH_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+# Function to get the set of member user IDs of a bubble, through bubble.membershipsearch
+# The account making the call is left out, so a sync can never kick itself
+def current_members(access_token, bubbleID, client=None):
+    return {int(Membership.from_raw(raw).user_id) for raw in iter_bubble_members(access_token, bubbleID, includeself=False, client=client)}
+
+# Changes needed to bring one bubble to its desired members
+@dataclass(slots=True)
+class MembershipChange:
+    bubble_id: object
+    invite: tuple = ()
+    kick: tuple = ()
+
+# Result of one call made by MembershipSync.apply
+# action is "invite", "kick", or "list" for a failed membershipsearch of the bubble
+@dataclass(slots=True)
+class OperationResult:
+    bubble_id: object
+    action: str
+    user_ids: tuple
+    ok: bool
+    error: Optional[str] = None
+
+#MEMBERSHIP SYNC
+# Brings many bubbles to a desired membership at once. desired maps each bubble ID to
+# the user IDs that should be in it; every bubble's current members are read through
+# bubble.membershipsearch and only the difference is applied, as one bubble.invite and
+# one bubble.kick per bubble (split into batch_size chunks). Bubbles are processed
+# concurrently, up to `workers` calls at a time, and invites and kicks for a bubble start
+# as soon as its members are known. Pair with a client rate_limiter and retry_policy for
+# large runs.
+# With kick=False members missing from desired are left alone. Users in keep are never
+# kicked; the account running the sync never is either, since its own membership isn't read.
+#EXAMPLE:
+# sync = MembershipSync(access_token, keep={bot_user_id}, workers=32)
+# report = sync.apply({3640189: [5302519, 5302367], 3640190: [5302519]})
+# failed = [result for result in report if not result.ok]
+class MembershipSync:
+    def __init__(self, access_token, client=None, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, kick=True, keep=(), sendemails=False, sendsms=False):
+        self.access_token = access_token
+        self.client = client if client is not None else get_default_client()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.kick = kick
+        self.keep = {int(user_id) for user_id in keep}
+        self.sendemails = sendemails
+        self.sendsms = sendsms
+
+    # Diff one bubble's current members against the desired ones
+    def diff(self, bubbleID, desired, current):
+        desired = {int(user_id) for user_id in desired}
+        kick = sorted(current - desired - self.keep) if self.kick else []
+        return MembershipChange(bubbleID, tuple(sorted(desired - current)), tuple(kick))
+
+    def _plan_bubble(self, bubbleID, desired):
+        return self.diff(bubbleID, desired, current_members(self.access_token, bubbleID, self.client))
+
+    # Returns the MembershipChange for every bubble in desired, without changing anything
+    # Bubbles whose members couldn't be read are left out and logged
+    def plan(self, desired):
+        changes = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._plan_bubble, bubbleID, users): bubbleID for bubbleID, users in desired.items()}
+            for future in as_completed(futures):
+                try:
+                    changes.append(future.result())
+                except BackendError as err:
+                    logger.error(f"Reading members of bubble {futures[future]} failed: {err}")
+        return changes
+
+    def _batches(self, user_ids):
+        return [user_ids[start:start + self.batch_size] for start in range(0, len(user_ids), self.batch_size)]
+
+    def _invite(self, bubbleID, user_ids):
+        invitations = [{"user_id": user_id} for user_id in user_ids]
+        self.client.addMemberToBubble(self.access_token, bubbleID, invitations, self.sendemails, self.sendsms)
+
+    def _kick(self, bubbleID, user_ids):
+        self.client.kickUserFromBubble(self.access_token, bubbleID, list(user_ids))
+
+    def _run(self, bubbleID, action, user_ids, call):
+        try:
+            call(bubbleID, user_ids)
+        except BackendError as err:
+            logger.error(f"{action} of {len(user_ids)} users in bubble {bubbleID} failed: {err}")
+            return OperationResult(bubbleID, action, tuple(user_ids), False, str(err))
+        return OperationResult(bubbleID, action, tuple(user_ids), True)
+
+    # Start the invite and kick calls for one bubble, returning their futures
+    def _submit_change(self, executor, change):
+        futures = [executor.submit(self._run, change.bubble_id, "invite", user_ids, self._invite) for user_ids in self._batches(change.invite)]
+        futures += [executor.submit(self._run, change.bubble_id, "kick", user_ids, self._kick) for user_ids in self._batches(change.kick)]
+        return futures
+
+    # Apply desired (a {bubble ID: user IDs} mapping) or a list of MembershipChange from plan()
+    # Returns one OperationResult per call made, plus one per bubble that couldn't be read
+    def apply(self, desired):
+        report = []
+        operations = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            if isinstance(desired, dict):
+                plans = {executor.submit(self._plan_bubble, bubbleID, users): bubbleID for bubbleID, users in desired.items()}
+                for future in as_completed(plans):
+                    try:
+                        operations += self._submit_change(executor, future.result())
+                    except BackendError as err:
+                        logger.error(f"Reading members of bubble {plans[future]} failed: {err}")
+                        report.append(OperationResult(plans[future], "list", (), False, str(err)))
+            else:
+                for change in desired:
+                    operations += self._submit_change(executor, change)
+            report.extend(operation.result() for operation in operations)
+        return report
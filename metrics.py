@@ -0,0 +1,204 @@
+import bisect, logging, threading
+
+# Upper bounds in seconds of the latency histogram buckets, as Prometheus client libraries use
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+# Function to escape a Prometheus label value
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Function to get the status label of a call: the HTTP status, "cache", "shared" or "error"
+def call_status(call):
+    if call.cache_hit:
+        return "cache"
+    if call.shared:
+        return "shared"
+    if call.status_code is not None:
+        return str(call.status_code)
+    return "error"
+
+# Latency histogram and counters for one endpoint
+class _EndpointStats:
+    __slots__ = ("buckets", "latency_sum", "count", "statuses", "bytes_out", "bytes_in", "retries", "cache_hits", "errors")
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.errors = 0
+
+#METRICS REGISTRY
+# In-memory metrics sink for ProntoClient and AsyncProntoClient. Every call is counted
+# per endpoint and status, its latency goes into a histogram, and bytes sent and
+# received, retries, cache hits and errors are added up. snapshot() returns the numbers
+# as a dict and prometheus_text() renders them in the Prometheus text format.
+#EXAMPLE:
+# metrics = MetricsRegistry()
+# client = ProntoClient(metrics=metrics)
+# start_http_exporter(metrics, 9464)
+# metrics.snapshot()["bubble.list"]["p99"]
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+    def record(self, call):
+        with self.lock:
+            stats = self.endpoints.get(call.endpoint)
+            if stats is None:
+                stats = self.endpoints[call.endpoint] = _EndpointStats(len(self.bucket_bounds))
+            stats.buckets[bisect.bisect_left(self.bucket_bounds, call.latency)] += 1
+            stats.latency_sum += call.latency
+            stats.count += 1
+            status = call_status(call)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes_out += call.bytes_out
+            stats.bytes_in += call.bytes_in
+            stats.retries += call.retries
+            stats.cache_hits += call.cache_hit
+            stats.errors += call.error is not None
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+    # Estimate a latency quantile from the histogram, as the upper bound of its bucket
+    def _quantile(self, stats, q):
+        target = q * stats.count
+        seen = 0
+        for index, count in enumerate(stats.buckets):
+            seen += count
+            if seen >= target and count:
+                return self.bucket_bounds[index] if index < len(self.bucket_bounds) else float("inf")
+        return 0.0
+
+    # Returns {endpoint: {count, errors, retries, cache_hits, bytes_out, bytes_in, mean, p50, p99, statuses}}
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "cache_hits": stats.cache_hits,
+                    "bytes_out": stats.bytes_out,
+                    "bytes_in": stats.bytes_in,
+                    "mean": stats.latency_sum / stats.count if stats.count else 0.0,
+                    "p50": self._quantile(stats, 0.5),
+                    "p99": self._quantile(stats, 0.99),
+                    "statuses": dict(stats.statuses),
+                }
+                for endpoint, stats in self.endpoints.items()
+            }
+
+    # Render every metric in the Prometheus text exposition format
+    def prometheus_text(self):
+        lines = [
+            "# HELP pronto_requests_total Pronto API calls by endpoint and status.",
+            "# TYPE pronto_requests_total counter",
+        ]
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            for endpoint, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'pronto_requests_total{{endpoint="{_label(endpoint)}",status="{_label(status)}"}} {count}')
+            lines += [
+                "# HELP pronto_request_duration_seconds Pronto API call latency, including retries.",
+                "# TYPE pronto_request_duration_seconds histogram",
+            ]
+            for endpoint, stats in endpoints:
+                name = _label(endpoint)
+                cumulative = 0
+                for bound, count in zip(self.bucket_bounds, stats.buckets):
+                    cumulative += count
+                    lines.append(f'pronto_request_duration_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'pronto_request_duration_seconds_bucket{{endpoint="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'pronto_request_duration_seconds_sum{{endpoint="{name}"}} {stats.latency_sum}')
+                lines.append(f'pronto_request_duration_seconds_count{{endpoint="{name}"}} {stats.count}')
+            lines += [
+                "# HELP pronto_request_bytes_total Request and response body bytes.",
+                "# TYPE pronto_request_bytes_total counter",
+            ]
+            for endpoint, stats in endpoints:
+                lines.append(f'pronto_request_bytes_total{{endpoint="{_label(endpoint)}",direction="out"}} {stats.bytes_out}')
+                lines.append(f'pronto_request_bytes_total{{endpoint="{_label(endpoint)}",direction="in"}} {stats.bytes_in}')
+            for metric, attribute, help_text in (
+                ("pronto_retries_total", "retries", "Retried attempts."),
+                ("pronto_cache_hits_total", "cache_hits", "Calls answered from the response cache."),
+                ("pronto_errors_total", "errors", "Calls that raised BackendError."),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for endpoint, stats in endpoints:
+                    lines.append(f'{metric}{{endpoint="{_label(endpoint)}"}} {getattr(stats, attribute)}')
+        return "\n".join(lines) + "\n"
+
+# Function to serve registry.prometheus_text() at /metrics from a daemon thread
+# Returns the server; call shutdown() on it to stop. port=0 picks a free port.
+def start_http_exporter(registry, port=9464, host="0.0.0.0"):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="pronto-metrics", daemon=True).start()
+    return server
+
+#OPENTELEMETRY SINK
+# Metrics sink that turns each call into an OpenTelemetry span named "pronto <endpoint>",
+# with the call's real start and end times and its status, sizes and retries as attributes.
+# Needs the opentelemetry-api package; spans go wherever the configured tracer provider sends them.
+#EXAMPLE:
+# client = ProntoClient(metrics=FanoutSink(MetricsRegistry(), OpenTelemetrySink()))
+class OpenTelemetrySink:
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("pronto")
+
+    def record(self, call):
+        start = int(call.started_at * 1e9)
+        span = self.tracer.start_span(f"pronto {call.endpoint}", kind=self.trace.SpanKind.CLIENT, start_time=start)
+        span.set_attribute("pronto.endpoint", call.endpoint)
+        span.set_attribute("pronto.retries", call.retries)
+        span.set_attribute("pronto.cache_hit", call.cache_hit)
+        span.set_attribute("pronto.shared", call.shared)
+        span.set_attribute("http.request.body.size", call.bytes_out)
+        span.set_attribute("http.response.body.size", call.bytes_in)
+        if call.status_code is not None:
+            span.set_attribute("http.response.status_code", call.status_code)
+        if call.error is not None:
+            span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, call.error))
+        span.end(end_time=start + int(call.latency * 1e9))
+
+# Metrics sink that passes every call on to several sinks
+class FanoutSink:
+    def __init__(self, *sinks):
+        self.sinks = sinks
+
+    def record(self, call):
+        for sink in self.sinks:
+            try:
+                sink.record(call)
+            except Exception as err:
+                logger.error(f"Metrics sink {type(sink).__name__} failed: {err}")
@@ -0,0 +1,390 @@
+import gzip, hashlib, json, logging, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from api import READ_ENDPOINTS, endpoint_name
+
+# Default size of the generated dataset
+DEFAULT_USERS = 50
+DEFAULT_BUBBLES = 20
+DEFAULT_MESSAGES_PER_BUBBLE = 200
+# Page sizes the mock uses for bubble.history and bubble.membershipsearch
+DEFAULT_HISTORY_PAGE_SIZE = 50
+DEFAULT_MEMBERSHIP_PAGE_SIZE = 25
+# Smallest JSON body the mock gzips for clients that accept it
+COMPRESS_MIN_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+WORDS = ("lunch", "meeting", "deploy", "review", "friday", "budget", "report", "coffee", "release", "design", "ticket", "standup")
+
+#MOCK SERVER
+# In-process stand-in for the Pronto API for benchmarks and local development. It serves
+# the endpoints api.py calls from a generated in-memory dataset, over keep-alive HTTP/1.1
+# so pooled clients behave as they would against the real API.
+# Every response can be slowed by latency seconds (plus up to jitter more), and a share of
+# requests can be failed: error_rate of them with a 500 and throttle_rate of them with a
+# 429 carrying Retry-After: retry_after. latency, error_rate and throttle_rate may also be
+# dicts of {endpoint name: value} with "*" as the default, e.g. {"bubble.history": 0.05, "*": 0.01}.
+# Read endpoints send an ETag and answer a matching If-None-Match with 304 unless
+# etags=False, and JSON bodies are gzipped for clients that accept it unless compress=False.
+# requests counts the requests served per endpoint.
+#EXAMPLE:
+# with MockProntoServer(latency=0.02, throttle_rate=0.05) as server:
+#     client = ProntoClient(base_url=server.url)
+#     client.getUsersBubbles("token")
+class MockProntoServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, retry_after=1, users=DEFAULT_USERS, bubbles=DEFAULT_BUBBLES, messages_per_bubble=DEFAULT_MESSAGES_PER_BUBBLE, history_page_size=DEFAULT_HISTORY_PAGE_SIZE, membership_page_size=DEFAULT_MEMBERSHIP_PAGE_SIZE, etags=True, compress=True, seed=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.history_page_size = history_page_size
+        self.membership_page_size = membership_page_size
+        self.etags = etags
+        self.compress = compress
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {}
+        # Multipart uploads in progress, and completed files served under /media/<id>
+        self.uploads = {}
+        self.files = {}
+        self.server = None
+        self._generate(users, bubbles, messages_per_bubble)
+
+    def _generate(self, user_count, bubble_count, messages_per_bubble):
+        self.users = {
+            user_id: {
+                "id": user_id,
+                "firstname": f"First{user_id}",
+                "lastname": f"Last{user_id}",
+                "fullname": f"First{user_id} Last{user_id}",
+                "email": f"user{user_id}@example.com",
+                "profilepicurl": None,
+                "isonline": False,
+            }
+            for user_id in range(1, user_count + 1)
+        }
+        user_ids = list(self.users)
+        self.bubbles = {}
+        self.members = {}
+        self.messages = {}
+        self.next_message_id = 1
+        for index in range(bubble_count):
+            bubble_id = 1000 + index
+            members = sorted(self.random.sample(user_ids, min(len(user_ids), self.random.randint(2, 40))))
+            self.members[bubble_id] = members
+            self.bubbles[bubble_id] = {
+                "id": bubble_id,
+                "title": f"Bubble {bubble_id}",
+                "category_id": None,
+                "organization_id": 1,
+                "isdm": len(members) == 2,
+                "memberscount": len(members),
+                "unread": 0,
+                "created_at": "2025-01-01 00:00:00",
+                "updated_at": "2025-01-01 00:00:00",
+            }
+            self.messages[bubble_id] = []
+        for _ in range(messages_per_bubble):
+            for bubble_id in self.bubbles:
+                self._add_message(bubble_id, self.random.choice(self.members[bubble_id]), " ".join(self.random.sample(WORDS, 4)))
+
+    def _add_message(self, bubble_id, user_id, text, created_at=None, parentmessage_id=None):
+        message_id = self.next_message_id
+        self.next_message_id += 1
+        message = {
+            "id": message_id,
+            "bubble_id": bubble_id,
+            "user_id": user_id,
+            "message": text,
+            "created_at": created_at or time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1735689600 + message_id)),
+            "updated_at": None,
+            "parentmessage_id": parentmessage_id,
+            "user": self.users.get(user_id),
+            "reactionsummary": [],
+        }
+        self.messages[bubble_id].append(message)
+        return message
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle's algorithm
+            # and delayed ACKs add ~40ms to every keep-alive response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                self._respond(*server.handle(self.path, body, self.command, self.headers))
+
+            do_PUT = do_POST
+            do_GET = do_POST
+
+            # payload is a JSON-able object, or bytes sent as they are
+            def _respond(self, status, headers, payload):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if "Content-Type" not in headers:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            # The default backlog of 5 drops connections when a benchmark opens a burst of them
+            request_queue_size = 256
+
+        self.server = Server((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="pronto-mock", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Look up a fault setting that is either one value or {endpoint: value, "*": default}
+    def _setting(self, value, endpoint):
+        if isinstance(value, dict):
+            return value.get(endpoint, value.get("*", 0.0))
+        return value
+
+    # Serve one request, returning (status, headers, JSON body or raw bytes)
+    def handle(self, path, body, method="POST", headers=None):
+        path, _, query = path.partition("?")
+        endpoint = "media" if method == "GET" else endpoint_name(path)
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            roll = self.random.random()
+            delay = self._setting(self.latency, endpoint) + self.random.random() * self.jitter
+        if delay > 0:
+            time.sleep(delay)
+        throttle_rate = self._setting(self.throttle_rate, endpoint)
+        if roll < throttle_rate:
+            return 429, {"Retry-After": str(self.retry_after)}, {"ok": False, "error": "Too Many Attempts."}
+        if roll < throttle_rate + self._setting(self.error_rate, endpoint):
+            return 500, {}, {"ok": False, "error": "Server Error"}
+        if method == "GET":
+            return self._media_get(path.rstrip("/").rsplit("/", 1)[-1], (headers or {}).get("Range"))
+        if method == "PUT":
+            with self.lock:
+                return self._upload_part(parse_qs(query), body)
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {}, {"ok": False, "error": "Invalid JSON"}
+        route = self.routes.get(endpoint)
+        if route is None:
+            return 200, {}, {"ok": True}
+        with self.lock:
+            try:
+                result = route(self, payload)
+            except (KeyError, TypeError, ValueError) as err:
+                return 422, {}, {"ok": False, "error": f"Bad request: {err}"}
+            data = json.dumps(result).encode("utf-8")
+        return self._encode(endpoint, data, headers or {})
+
+    # Add an ETag to a read response, answering 304 if the client already has it, and
+    # gzip the body if the client accepts it
+    def _encode(self, endpoint, data, request_headers):
+        headers = {"Content-Type": "application/json"}
+        if self.etags and endpoint in READ_ENDPOINTS:
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            headers["ETag"] = etag
+            if request_headers.get("If-None-Match") == etag:
+                return 304, headers, b""
+        if self.compress and len(data) >= COMPRESS_MIN_SIZE and "gzip" in request_headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+            data = gzip.compress(data)
+        return 200, headers, data
+
+    def _bubble(self, payload):
+        return self.bubbles[int(payload["bubble_id"])]
+
+    def _tokenlogin(self, payload):
+        expires = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() + 3600))
+        return {"ok": True, "users": [{"accesstoken": f"mock-{token}", "accesstokenexpiration": expires} for token in payload["logintokens"]]}
+
+    def _bubble_list(self, payload):
+        return {"ok": True, "bubbles": list(self.bubbles.values())}
+
+    def _bubble_history(self, payload):
+        messages = self.messages[int(payload["bubble_id"])]
+        latest = payload.get("latest")
+        if latest is not None:
+            messages = [message for message in messages if message["id"] < int(latest)]
+        return {"ok": True, "messages": messages[-self.history_page_size:][::-1]}
+
+    def _bubble_info(self, payload):
+        return {"ok": True, "bubble": self._bubble(payload)}
+
+    def _bubble_mark(self, payload):
+        self._bubble(payload)["unread"] = 0
+        return {"ok": True}
+
+    def _bubble_invite(self, payload):
+        # bubble.invite names the bubble "bubbleID" where every other endpoint uses "bubble_id"
+        payload = dict(payload, bubble_id=payload.get("bubbleID", payload.get("bubble_id")))
+        members = self.members[int(payload["bubble_id"])]
+        for invitation in payload.get("invitations") or []:
+            user_id = int(invitation["user_id"] if isinstance(invitation, dict) else invitation)
+            if user_id not in members:
+                members.append(user_id)
+        members.sort()
+        self._bubble(payload)["memberscount"] = len(members)
+        return {"ok": True}
+
+    def _bubble_kick(self, payload):
+        bubble_id = int(payload["bubble_id"])
+        kicked = {int(user_id) for user_id in payload.get("users") or []}
+        self.members[bubble_id] = [user_id for user_id in self.members[bubble_id] if user_id not in kicked]
+        self._bubble(payload)["memberscount"] = len(self.members[bubble_id])
+        return {"ok": True}
+
+    def _bubble_update(self, payload):
+        bubble = self._bubble(payload)
+        for key in ("title", "category_id"):
+            if payload.get(key) is not None:
+                bubble[key] = payload[key]
+        return {"ok": True, "bubble": bubble}
+
+    def _membership_search(self, payload):
+        bubble_id = int(payload["bubble_id"])
+        page = int(payload.get("page") or 1)
+        start = (page - 1) * self.membership_page_size
+        members = self.members[bubble_id][start:start + self.membership_page_size]
+        return {"ok": True, "memberships": [{"user_id": user_id, "bubble_id": bubble_id, "role": "member", "user": self.users[user_id]} for user_id in members]}
+
+    def _message_create(self, payload):
+        bubble_id = int(payload["bubble_id"])
+        message = self._add_message(bubble_id, payload.get("user_id"), payload.get("message", ""), payload.get("created_at"), payload.get("parentmessage_id"))
+        self.bubbles[bubble_id]["updated_at"] = message["created_at"]
+        return {"ok": True, "message": message}
+
+    def _message_search(self, payload):
+        query = str(payload.get("query") or "").lower()
+        bubble_ids = [int(payload["bubble_id"])] if payload.get("bubble_id") is not None else list(self.messages)
+        user_ids = {int(user_id) for user_id in payload.get("user_ids") or []}
+        found = [
+            message
+            for bubble_id in bubble_ids
+            for message in self.messages[bubble_id]
+            if query in message["message"].lower() and (not user_ids or message["user_id"] in user_ids)
+        ]
+        found.sort(key=lambda message: message["id"], reverse=True)
+        start = int(payload.get("from") or 0)
+        return {"ok": True, "messages": found[start:start + int(payload.get("size") or 25)], "total": len(found)}
+
+    def _user_info(self, payload):
+        return {"ok": True, "user": self.users[int(payload["id"])]}
+
+    def _mutual_groups(self, payload):
+        user_id = int(payload["id"])
+        return {"ok": True, "bubbles": [self.bubbles[bubble_id] for bubble_id, members in self.members.items() if user_id in members]}
+
+    def _presence(self, payload):
+        for entry in payload.get("data") or []:
+            user = self.users.get(int(entry["user_id"]))
+            if user is not None:
+                user["isonline"] = entry.get("isonline")
+        return {"ok": True}
+
+    def _upload_start(self, payload):
+        upload_id = f"upload-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {"filename": payload["filename"], "mimetype": payload.get("mimetype"), "parts": {}}
+        return {"ok": True, "upload_id": upload_id}
+
+    def _upload_part(self, query, body):
+        upload = self.uploads.get(query.get("upload_id", [None])[0])
+        if upload is None or "part" not in query:
+            return 404, {}, {"ok": False, "error": "Unknown upload"}
+        upload["parts"][int(query["part"][0])] = body
+        return 200, {}, {"ok": True}
+
+    def _upload_status(self, payload):
+        return {"ok": True, "parts": sorted(self.uploads[payload["upload_id"]]["parts"])}
+
+    def _upload_complete(self, payload):
+        upload = self.uploads[payload["upload_id"]]
+        parts = upload["parts"]
+        if any(part not in parts for part in range(int(payload["parts"]))):
+            raise ValueError("missing parts")
+        data = b"".join(parts[part] for part in range(int(payload["parts"])))
+        file_id = str(len(self.files) + 1)
+        self.files[file_id] = data
+        return {"ok": True, "media": {"id": int(file_id), "title": upload["filename"], "mimetype": upload["mimetype"], "size": len(data), "url": f"{self.url}media/{file_id}"}}
+
+    def _media_get(self, file_id, range_header):
+        data = self.files.get(file_id)
+        if data is None:
+            return 404, {}, {"ok": False, "error": "Not found"}
+        headers = {"Content-Type": "application/octet-stream", "Accept-Ranges": "bytes"}
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-", 1)[0])
+            if start >= len(data):
+                return 416, {"Content-Range": f"bytes */{len(data)}"}, b""
+            headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+            return 206, headers, data[start:]
+        return 200, headers, data
+
+    routes = {
+        "user.tokenlogin": _tokenlogin,
+        "bubble.list": _bubble_list,
+        "bubble.history": _bubble_history,
+        "bubble.info": _bubble_info,
+        "bubble.mark": _bubble_mark,
+        "bubble.invite": _bubble_invite,
+        "bubble.kick": _bubble_kick,
+        "bubble.update": _bubble_update,
+        "bubble.membershipsearch": _membership_search,
+        "message.create": _message_create,
+        "message.search": _message_search,
+        "user.info": _user_info,
+        "user.mutualgroups": _mutual_groups,
+        "presence": _presence,
+        "file.upload.start": _upload_start,
+        "file.upload.status": _upload_status,
+        "file.upload.complete": _upload_complete,
+    }
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve a mock Pronto API")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = MockProntoServer(port=args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate).start()
+    logger.info(f"Mock Pronto API at {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,167 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+#MODELS
+# Compact typed views of Pronto responses, in the same style as api.DeviceInfo but with
+# __slots__ so each object is a fixed set of attribute slots instead of a dict.
+# Fields are copied out of the payload once, nested objects (a message's user and
+# reactions, a membership's user) included, so nothing refers back to the payload and its
+# dicts can be freed. Within one parsed response, messages or memberships by the same user
+# share one User object, so treat models as read-only.
+# raw is the original payload as an escape hatch for fields not modelled here. It's only
+# kept with keep_raw=True, which holds the whole payload in memory alongside the models.
+#EXAMPLE:
+# bubbles = parse_bubbles(getUsersBubbles(access_token))
+# messages = parse_messages(get_bubble_messages(access_token, bubbles[0].id))
+# messages[0].user.fullname
+
+@dataclass(slots=True)
+class User:
+    id: int
+    firstname: Optional[str] = None
+    lastname: Optional[str] = None
+    fullname: Optional[str] = None
+    email: Optional[str] = None
+    profilepicurl: Optional[str] = None
+    isonline: Optional[bool] = None
+    raw: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_raw(cls, raw, keep_raw=False):
+        return cls(
+            raw.get("id"),
+            raw.get("firstname"),
+            raw.get("lastname"),
+            raw.get("fullname"),
+            raw.get("email"),
+            raw.get("profilepicurl"),
+            raw.get("isonline"),
+            raw if keep_raw else None,
+        )
+
+# Function to turn a nested user payload into a User, reusing the one in users for that ID
+def _shared_user(raw, keep_raw, users):
+    if not isinstance(raw, dict):
+        return None
+    if users is None or keep_raw:
+        return User.from_raw(raw, keep_raw)
+    user = users.get(raw.get("id"))
+    if user is None:
+        user = users[raw.get("id")] = User.from_raw(raw)
+    return user
+
+@dataclass(slots=True)
+class Reaction:
+    reactiontype_id: int
+    count: int = 0
+    user_ids: tuple = ()
+    raw: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_raw(cls, raw, keep_raw=False):
+        users = raw.get("users") or ()
+        return cls(
+            raw.get("reactiontype_id"),
+            raw.get("count", len(users)),
+            tuple(user["id"] if isinstance(user, dict) else user for user in users),
+            raw if keep_raw else None,
+        )
+
+@dataclass(slots=True)
+class Bubble:
+    id: int
+    title: Optional[str] = None
+    category_id: Optional[int] = None
+    organization_id: Optional[int] = None
+    isdm: Optional[bool] = None
+    memberscount: Optional[int] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    raw: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_raw(cls, raw, keep_raw=False):
+        return cls(
+            raw.get("id"),
+            raw.get("title"),
+            raw.get("category_id"),
+            raw.get("organization_id"),
+            raw.get("isdm"),
+            raw.get("memberscount"),
+            raw.get("created_at"),
+            raw.get("updated_at"),
+            raw if keep_raw else None,
+        )
+
+@dataclass(slots=True)
+class Message:
+    id: int
+    bubble_id: Optional[int] = None
+    user_id: Optional[int] = None
+    message: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    parentmessage_id: Optional[int] = None
+    user: Optional[User] = None
+    reactions: tuple = ()
+    raw: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    # users is an optional {user ID: User} shared across a response, to reuse User objects
+    @classmethod
+    def from_raw(cls, raw, keep_raw=False, users=None):
+        reactions = raw.get("reactionsummary", raw.get("reactions")) or ()
+        return cls(
+            raw.get("id"),
+            raw.get("bubble_id"),
+            raw.get("user_id"),
+            raw.get("message"),
+            raw.get("created_at"),
+            raw.get("updated_at"),
+            raw.get("parentmessage_id"),
+            _shared_user(raw.get("user"), keep_raw, users),
+            tuple(Reaction.from_raw(reaction, keep_raw) for reaction in reactions),
+            raw if keep_raw else None,
+        )
+
+@dataclass(slots=True)
+class Membership:
+    user_id: int
+    bubble_id: Optional[int] = None
+    role: Optional[str] = None
+    user: Optional[User] = None
+    raw: Optional[dict] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_raw(cls, raw, keep_raw=False, users=None):
+        user = raw.get("user")
+        return cls(
+            raw.get("user_id", user.get("id") if isinstance(user, dict) else None),
+            raw.get("bubble_id"),
+            raw.get("role"),
+            _shared_user(user, keep_raw, users),
+            raw if keep_raw else None,
+        )
+
+# Functions to turn whole responses into model lists
+
+# bubble.list response -> [Bubble]
+def parse_bubbles(response, keep_raw=False):
+    return [Bubble.from_raw(bubble, keep_raw) for bubble in response.get("bubbles") or []]
+
+# bubble.info response -> Bubble
+def parse_bubble(response, keep_raw=False):
+    return Bubble.from_raw(response.get("bubble", response), keep_raw)
+
+# bubble.history or message.search response -> [Message]
+def parse_messages(response, keep_raw=False):
+    users = {}
+    return [Message.from_raw(message, keep_raw, users) for message in response.get("messages") or []]
+
+# user.info response -> User
+def parse_user(response, keep_raw=False):
+    return User.from_raw(response.get("user", response), keep_raw)
+
+# bubble.membershipsearch response -> [Membership]
+def parse_memberships(response, keep_raw=False):
+    users = {}
+    return [Membership.from_raw(membership, keep_raw, users) for membership in response.get("memberships") or response.get("users") or []]
@@ -0,0 +1,126 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from api import get_default_client
+
+# Default number of pages fetched ahead of the one being read
+DEFAULT_PREFETCH = 2
+
+#PAGINATION
+# Lazy iterators over every result of message.search and every member of a bubble.
+# Pages are requested `prefetch` at a time ahead of the caller, so reading results
+# overlaps with fetching the next pages. Stopping early (break, or closing the
+# generator) cancels pages that haven't been sent yet; `limit` stops after that many
+# items. A page shorter than the first one marks the end, so up to `prefetch` pages past
+# the end may be requested and come back empty.
+# message.search is paged by result offset. If the server returns fewer results than
+# page_size, the pages already requested are dropped and the following offsets step by the
+# size the server actually returned, so no results are skipped.
+
+# Function to get the result list out of a message.search response
+def search_page_items(page):
+    return page.get("messages") or []
+
+# Function to get the member list out of a bubble.membershipsearch response
+def membership_page_items(page):
+    return page.get("memberships") or page.get("users") or []
+
+# Function to get the step between fetch keys once the first page is known: the number of
+# items it held for offset paging if the server capped it below page_size, else None
+def _capped_step(page_size, first_page):
+    if page_size is not None and 0 < first_page < page_size:
+        return first_page
+    return None
+
+# Yield items from fetch(0), fetch(1), ... keeping `prefetch` pages in flight
+# With page_size, fetch takes a result offset instead: fetch(0), fetch(page_size), ...
+def _iter_pages(fetch, items_of, prefetch, limit, page_size=None):
+    executor = ThreadPoolExecutor(max_workers=prefetch + 1)
+    pending = deque()
+    step = page_size or 1
+    next_key = 0
+    full_page = None
+    count = 0
+    try:
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(executor.submit(fetch, next_key))
+                next_key += step
+            items = items_of(pending.popleft().result())
+            if full_page is None:
+                full_page = len(items)
+                capped = _capped_step(page_size, full_page)
+                if capped is not None:
+                    # Pages requested at the old step would skip results: start over after this one
+                    for future in pending:
+                        future.cancel()
+                    pending.clear()
+                    step = next_key = capped
+            for item in items:
+                if limit is not None and count >= limit:
+                    return
+                yield item
+                count += 1
+            if not items or len(items) < full_page:
+                return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Async counterpart of _iter_pages, where fetch(key) returns a coroutine
+async def _aiter_pages(fetch, items_of, prefetch, limit, page_size=None):
+    import asyncio
+    pending = deque()
+    step = page_size or 1
+    next_key = 0
+    full_page = None
+    count = 0
+    try:
+        while True:
+            while len(pending) <= prefetch:
+                pending.append(asyncio.ensure_future(fetch(next_key)))
+                next_key += step
+            items = items_of(await pending.popleft())
+            if full_page is None:
+                full_page = len(items)
+                capped = _capped_step(page_size, full_page)
+                if capped is not None:
+                    for task in pending:
+                        task.cancel()
+                    pending.clear()
+                    step = next_key = capped
+            for item in items:
+                if limit is not None and count >= limit:
+                    return
+                yield item
+                count += 1
+            if not items or len(items) < full_page:
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+
+# Generator over every message.search result, page_size results per request
+def iter_search_results(access_token, query, bubbleID=None, orderby=None, user_ids=None, page_size=25, prefetch=DEFAULT_PREFETCH, limit=None, client=None):
+    client = client if client is not None else get_default_client()
+    def fetch(offset):
+        return client.searchMessage(access_token, query, bubbleID, orderby, user_ids, page_size, offset)
+    return _iter_pages(fetch, search_page_items, prefetch, limit, page_size)
+
+# Generator over every member of a bubble, starting at page 1
+# The membership page size is set by the server
+def iter_bubble_members(access_token, bubble_id, orderby=["firstname", "lastname"], includeself=True, prefetch=DEFAULT_PREFETCH, limit=None, client=None):
+    client = client if client is not None else get_default_client()
+    def fetch(index):
+        return client.bubbleMembershipSearch(access_token, bubble_id, orderby, includeself, index + 1)
+    return _iter_pages(fetch, membership_page_items, prefetch, limit)
+
+# Async generator over every message.search result, for use with AsyncProntoClient
+def aiter_search_results(client, access_token, query, bubbleID=None, orderby=None, user_ids=None, page_size=25, prefetch=DEFAULT_PREFETCH, limit=None):
+    def fetch(offset):
+        return client.searchMessage(access_token, query, bubbleID, orderby, user_ids, page_size, offset)
+    return _aiter_pages(fetch, search_page_items, prefetch, limit, page_size)
+
+# Async generator over every member of a bubble, for use with AsyncProntoClient
+def aiter_bubble_members(client, access_token, bubble_id, orderby=["firstname", "lastname"], includeself=True, prefetch=DEFAULT_PREFETCH, limit=None):
+    def fetch(index):
+        return client.bubbleMembershipSearch(access_token, bubble_id, orderby, includeself, index + 1)
+    return _aiter_pages(fetch, membership_page_items, prefetch, limit)
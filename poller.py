@@ -0,0 +1,156 @@
+import heapq, logging, threading, time
+from api import BackendError, get_default_client
+from backfill import bubble_ids
+from history import iter_bubble_messages
+from ratelimit import TokenBucket
+
+# Default polling intervals in seconds for the busiest and the quietest bubbles
+DEFAULT_MIN_INTERVAL = 5.0
+DEFAULT_MAX_INTERVAL = 600.0
+# Default global request budget, as (requests per second, burst)
+DEFAULT_BUDGET = (2.0, 5)
+# Seconds between bubble.list refreshes, to pick up new bubbles and unread counts
+DEFAULT_REFRESH_INTERVAL = 300.0
+
+logger = logging.getLogger(__name__)
+
+# Function to get a bubble's unread count out of a bubble.list entry, 0 if it has none
+def unread_count(bubble):
+    for key in ("unread", "unreadcount", "unread_count"):
+        value = bubble.get(key)
+        if value:
+            return int(value)
+    return 0
+
+#ADAPTIVE POLLER
+# Polling fallback for when the realtime stream isn't available. Each bubble is polled at
+# its own interval: a bubble with new messages or unread messages drops to min_interval,
+# and every poll that finds nothing doubles its interval up to max_interval. All polls
+# share one request budget, so adding bubbles stretches intervals instead of raising the
+# request rate. New messages are delivered once each, oldest first, to
+# on_messages(bubbleID, messages); the first poll of a bubble only records where it is.
+# If on_messages raises, the error is logged and the same messages are delivered again on
+# the bubble's next poll.
+#EXAMPLE:
+# poller = AdaptivePoller(access_token, on_messages=handle_new, budget=(5, 10))
+# threading.Thread(target=poller.run, daemon=True).start()
+# ...
+# poller.stop()
+class AdaptivePoller:
+    def __init__(self, access_token, on_messages, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL, budget=DEFAULT_BUDGET, refresh_interval=DEFAULT_REFRESH_INTERVAL, client=None):
+        self.access_token = access_token
+        self.on_messages = on_messages
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.refresh_interval = refresh_interval
+        self.client = client if client is not None else get_default_client()
+        self.budget = TokenBucket(*budget)
+        self.intervals = {}
+        self.last_seen = {}
+        # Heap of (due time, bubbleID); an entry is stale once due[bubbleID] moves on
+        self.schedule = []
+        self.due = {}
+        self.next_refresh = 0.0
+        self.stopped = threading.Event()
+
+    # Reload the bubble list, scheduling new bubbles and making unread ones hot
+    def refresh_bubbles(self):
+        self._spend_budget()
+        bubbles = self.client.getUsersBubbles(self.access_token)
+        now = time.monotonic()
+        for bubble in bubbles.get("bubbles") or []:
+            bubbleID = bubble["id"]
+            if bubbleID not in self.intervals or unread_count(bubble) > 0:
+                self.intervals[bubbleID] = self.min_interval
+                self._schedule(bubbleID, now)
+        self.next_refresh = now + self.refresh_interval
+
+    # Add bubbles by hand, from a getUsersBubbles response or a list of IDs
+    def add_bubbles(self, bubbles):
+        now = time.monotonic()
+        for bubbleID in bubble_ids(bubbles):
+            if bubbleID not in self.intervals:
+                self.intervals[bubbleID] = self.min_interval
+                self._schedule(bubbleID, now)
+
+    def _schedule(self, bubbleID, due):
+        self.due[bubbleID] = due
+        heapq.heappush(self.schedule, (due, bubbleID))
+
+    def _spend_budget(self):
+        wait = self.budget.reserve()
+        if wait > 0:
+            self.stopped.wait(wait)
+
+    # Poll one bubble and return the new messages, oldest first
+    # Every bubble.history page fetched is charged to the request budget. The bubble's
+    # position only moves past new messages once mark_delivered() is called with them.
+    def poll_bubble(self, bubbleID):
+        client = _BudgetedClient(self)
+        last_seen = self.last_seen.get(bubbleID)
+        if last_seen is None:
+            messages = client.get_bubble_messages(self.access_token, bubbleID).get("messages") or []
+            self.last_seen[bubbleID] = max((int(message["id"]) for message in messages), default=0)
+            return []
+        new_messages = list(iter_bubble_messages(self.access_token, bubbleID, stop_at_id=last_seen, client=client))
+        new_messages.sort(key=lambda message: int(message["id"]))
+        return new_messages
+
+    # Move a bubble's position past messages that have been handed to on_messages
+    def mark_delivered(self, bubbleID, messages):
+        if messages:
+            self.last_seen[bubbleID] = max(self.last_seen.get(bubbleID, 0), max(int(message["id"]) for message in messages))
+
+    # Poll the bubble that is due soonest, waiting for it if needed
+    def run_once(self):
+        if time.monotonic() >= self.next_refresh:
+            try:
+                self.refresh_bubbles()
+            except BackendError as err:
+                logger.error(f"Refreshing bubbles failed: {err}")
+                self.next_refresh = time.monotonic() + self.min_interval
+        if not self.schedule:
+            self.stopped.wait(self.min_interval)
+            return
+        due, bubbleID = heapq.heappop(self.schedule)
+        if self.due.get(bubbleID) != due:
+            return
+        now = time.monotonic()
+        if due > now:
+            # Not due yet: sleep until it is, but wake up for the next bubble.list refresh
+            heapq.heappush(self.schedule, (due, bubbleID))
+            self.stopped.wait(min(due, self.next_refresh) - now)
+            return
+        try:
+            new_messages = self.poll_bubble(bubbleID)
+        except BackendError as err:
+            logger.error(f"Polling bubble {bubbleID} failed: {err}")
+            new_messages = []
+        if new_messages:
+            self.intervals[bubbleID] = self.min_interval
+            try:
+                self.on_messages(bubbleID, new_messages)
+            except Exception as err:
+                logger.error(f"Delivering {len(new_messages)} messages from bubble {bubbleID} failed: {err!r}")
+            else:
+                self.mark_delivered(bubbleID, new_messages)
+        else:
+            self.intervals[bubbleID] = min(self.max_interval, self.intervals[bubbleID] * 2)
+        self._schedule(bubbleID, time.monotonic() + self.intervals[bubbleID])
+
+    # Poll until stop() is called
+    def run(self):
+        while not self.stopped.is_set():
+            self.run_once()
+
+    def stop(self):
+        self.stopped.set()
+
+# Client wrapper that charges every bubble.history page to the poller's budget
+class _BudgetedClient:
+    def __init__(self, poller):
+        self.poller = poller
+
+    def get_bubble_messages(self, access_token, bubbleID, latestMessageID=None):
+        self.poller._spend_budget()
+        return self.poller.client.get_bubble_messages(access_token, bubbleID, latestMessageID)
@@ -0,0 +1,123 @@
+import random, threading, time
+from api import BackendError, READ_ENDPOINTS
+
+#RATE LIMITING
+# Token bucket refilled at `rate` requests per second, holding at most `burst` tokens
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Take one token and return how many seconds the caller has to wait before using it.
+    # Tokens can go negative, so callers queue up in order instead of all retrying at once.
+    def reserve(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+# Client-side rate limiter with a token bucket per endpoint, and per access token when
+# per_token=True. rates maps an endpoint name to (requests per second, burst), and the
+# "*" entry applies to every endpoint without its own entry.
+#EXAMPLE:
+# limiter = RateLimiter({"*": (20, 40), "message.create": (5, 5)})
+# client = ProntoClient(rate_limiter=limiter)
+class RateLimiter:
+    def __init__(self, rates, per_token=True):
+        self.rates = dict(rates)
+        self.per_token = per_token
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    # Returns how many seconds to wait before sending a request to endpoint
+    def reserve(self, endpoint, access_token=None):
+        rate = self.rates.get(endpoint, self.rates.get("*"))
+        if rate is None:
+            return 0.0
+        key = (endpoint if endpoint in self.rates else "*", access_token if self.per_token else None)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(*rate)
+        return bucket.reserve()
+
+#RETRIES
+# Retries failed requests with jittered exponential backoff, waiting at least as long as
+# the server's Retry-After header asks. If Retry-After is longer than max_delay the error
+# is raised instead, with its retry_after, rather than retried too early. 429s are always retried since the server rejected
+# the request outright; 5xx responses and network errors are only retried for read
+# endpoints unless retry_writes=True, so a write that may have landed isn't sent twice.
+class RetryPolicy:
+    def __init__(self, max_retries=3, base_delay=0.5, max_delay=30.0, retry_statuses=(429, 500, 502, 503, 504), retry_writes=False):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_writes = retry_writes
+
+    # Returns how long to sleep before retrying err, or None if it shouldn't be retried
+    def delay(self, attempt, err, endpoint):
+        if attempt >= self.max_retries:
+            return None
+        if err.status_code == 429:
+            pass
+        elif err.status_code in self.retry_statuses or err.network_error:
+            if not self.retry_writes and endpoint not in READ_ENDPOINTS:
+                return None
+        else:
+            return None
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        backoff = random.uniform(backoff / 2, backoff)
+        if err.retry_after is not None:
+            if err.retry_after > self.max_delay:
+                return None
+            backoff = max(backoff, err.retry_after)
+        return backoff
+
+#CIRCUIT BREAKER
+# Stops sending requests to an endpoint after failure_threshold consecutive server or
+# network failures, failing fast with BackendError for reset_timeout seconds. After that
+# one trial request is let through, and its result closes or reopens the circuit.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = {}
+        self.opened_at = {}
+        self.lock = threading.Lock()
+
+    # Raise BackendError if the circuit for endpoint is open
+    def before(self, endpoint):
+        with self.lock:
+            opened_at = self.opened_at.get(endpoint)
+            if opened_at is None:
+                return
+            if time.monotonic() - opened_at < self.reset_timeout:
+                raise BackendError(f"Circuit open for {endpoint}, failing fast")
+            # Let one trial request through; further callers fail fast until it resolves
+            self.opened_at[endpoint] = time.monotonic()
+
+    def record_success(self, endpoint):
+        with self.lock:
+            self.failures.pop(endpoint, None)
+            self.opened_at.pop(endpoint, None)
+
+    def record_failure(self, endpoint, err):
+        if not (err.network_error or (err.status_code is not None and err.status_code >= 500)):
+            return
+        with self.lock:
+            self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+            if self.failures[endpoint] >= self.failure_threshold:
+                self.opened_at[endpoint] = time.monotonic()
+
+    # Returns "closed" or "open" for endpoint
+    def state(self, endpoint):
+        with self.lock:
+            return "open" if endpoint in self.opened_at else "closed"
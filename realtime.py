@@ -0,0 +1,304 @@
+import asyncio, inspect, json, logging
+from dataclasses import dataclass
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+from history import aiter_bubble_messages
+
+# Pusher protocol version spoken by RealtimeClient
+PUSHER_PROTOCOL = 7
+# Endpoint that signs private channel subscriptions, and the channel each bubble's
+# events are published on, as used by the Pronto web app
+DEFAULT_AUTH_ENDPOINT = "api/v1/pusher.auth"
+DEFAULT_CHANNEL_FORMAT = "private-bubble.{bubble_id}"
+# Seconds without traffic before sending a ping, if the server doesn't say otherwise
+DEFAULT_ACTIVITY_TIMEOUT = 120
+
+logger = logging.getLogger(__name__)
+
+# Substrings of Pusher event names and the kind they're dispatched as, checked in order
+# so that e.g. "MessageReactionAdded" is a reaction rather than a message
+EVENT_KINDS = (
+    ("reaction", "reaction"),
+    ("member", "membership"),
+    ("message", "message"),
+)
+
+# Function to get the dispatch kind of a Pusher event name
+def event_kind(name):
+    lowered = name.lower()
+    for needle, kind in EVENT_KINDS:
+        if needle in lowered:
+            return kind
+    return "other"
+
+# Put on the event queue by close() to end events()
+_CLOSED = object()
+
+# Function to get the message ID out of a message event payload, or None
+def _message_id(data):
+    if not isinstance(data, dict):
+        return None
+    message = data.get("message") if isinstance(data.get("message"), dict) else data
+    message_id = message.get("id")
+    return int(message_id) if message_id is not None else None
+
+# One event received from the realtime channel
+# kind is "message", "reaction", "membership" or "other", name is the raw Pusher event
+# name, and resumed is True for messages fetched to fill a gap after a reconnect.
+# Message events carry the Pusher payload, {"message": {...}}, whether live or resumed.
+@dataclass(slots=True)
+class RealtimeEvent:
+    kind: str
+    name: str
+    channel: str
+    data: object
+    bubble_id: object = None
+    resumed: bool = False
+
+#REALTIME CLIENT
+# Push-based subscription to bubble events over Pronto's Pusher websocket.
+# Reconnects with exponential backoff and re-subscribes every bubble. With resume=True,
+# messages sent while disconnected are fetched through bubble.history (down to the last
+# message seen on each bubble) and delivered as resumed events before live ones.
+# client is an AsyncProntoClient used to sign private channels and to fill gaps.
+# Handlers registered with on() may be plain functions or coroutines.
+#EXAMPLE:
+# realtime = RealtimeClient(async_client, access_token, app_key, cluster)
+# realtime.on("message", handle_message)
+# await realtime.subscribe(bubbleID)
+# async for event in realtime.events():
+#     ...
+class RealtimeClient:
+    def __init__(self, client, access_token, app_key=None, cluster=None, url=None, auth_endpoint=DEFAULT_AUTH_ENDPOINT, channel_format=DEFAULT_CHANNEL_FORMAT, resume=True, reconnect_delay=1.0, max_reconnect_delay=60.0):
+        self.client = client
+        self.access_token = access_token
+        self.url = url if url is not None else f"wss://ws-{cluster}.pusher.com/app/{app_key}?protocol={PUSHER_PROTOCOL}&client=python&version=1.0"
+        self.auth_endpoint = auth_endpoint
+        self.channel_format = channel_format
+        self.resume = resume
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.handlers = {}
+        self.channels = {}
+        self.last_seen = {}
+        # Message IDs delivered by the last gap fill, per bubble, so live copies are skipped
+        self.resumed = {}
+        self.connection = None
+        self.socket_id = None
+        self.connected = asyncio.Event()
+        self.queue = None
+        self.task = None
+        self.closed = False
+
+    # Register a handler for "message", "reaction", "membership", "other" or "*" for all
+    def on(self, kind, handler):
+        self.handlers.setdefault(kind, []).append(handler)
+
+    async def subscribe(self, bubbleID):
+        channel = self.channel_format.format(bubble_id=bubbleID)
+        self.channels[channel] = bubbleID
+        if self.connection is not None:
+            await self._send_subscribe(channel)
+
+    async def unsubscribe(self, bubbleID):
+        channel = self.channel_format.format(bubble_id=bubbleID)
+        self.channels.pop(channel, None)
+        if self.connection is not None:
+            await self._send("pusher:unsubscribe", {"channel": channel})
+
+    # Start the connection loop in the background if it isn't running yet
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    # Async iterator over every event, starting the connection if needed; ends on close()
+    async def events(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        self.start()
+        while not self.closed:
+            event = await self.queue.get()
+            if event is _CLOSED:
+                return
+            yield event
+
+    async def close(self):
+        self.closed = True
+        if self.queue is not None:
+            self.queue.put_nowait(_CLOSED)
+        if self.connection is not None:
+            await self.connection.close()
+        if self.task is not None:
+            self.task.cancel()
+
+    # Connect, and reconnect with backoff whenever the connection drops, until closed
+    async def run(self):
+        delay = self.reconnect_delay
+        first = True
+        while not self.closed:
+            try:
+                async with connect(self.url) as connection:
+                    self.connection = connection
+                    activity_timeout = await self._handshake(connection)
+                    delay = self.reconnect_delay
+                    for channel in list(self.channels):
+                        await self._send_subscribe(channel)
+                    self.connected.set()
+                    self.resumed = {}
+                    if not first and self.resume:
+                        await self._fill_gaps()
+                    first = False
+                    await self._receive(connection, activity_timeout)
+            except Exception as err:
+                # Rejected handshakes, bad auth responses and malformed frames are retried too
+                logger.warning(f"Realtime connection lost: {err!r}")
+            finally:
+                self.connection = None
+                self.connected.clear()
+            if self.closed:
+                return
+            await asyncio.sleep(delay)
+            delay = min(self.max_reconnect_delay, delay * 2)
+
+    async def _handshake(self, connection):
+        message = json.loads(await connection.recv())
+        if message.get("event") != "pusher:connection_established":
+            raise ConnectionError(f"Unexpected realtime handshake: {message}")
+        data = json.loads(message["data"])
+        self.socket_id = data["socket_id"]
+        return data.get("activity_timeout", DEFAULT_ACTIVITY_TIMEOUT)
+
+    async def _receive(self, connection, activity_timeout):
+        while True:
+            try:
+                raw = await asyncio.wait_for(connection.recv(), activity_timeout)
+            except asyncio.TimeoutError:
+                # Quiet connection: ping, and treat a second silence as a dead connection
+                await self._send("pusher:ping", {})
+                raw = await asyncio.wait_for(connection.recv(), activity_timeout)
+            message = json.loads(raw)
+            name = message.get("event", "")
+            if name == "pusher:ping":
+                await self._send("pusher:pong", {})
+            elif name == "pusher:error":
+                logger.error(f"Realtime error: {message.get('data')}")
+            elif not name.startswith(("pusher:", "pusher_internal:")):
+                data = message.get("data")
+                if isinstance(data, str):
+                    try:
+                        data = json.loads(data)
+                    except ValueError:
+                        pass
+                channel = message.get("channel")
+                await self._dispatch(RealtimeEvent(event_kind(name), name, channel, data, self.channels.get(channel)))
+
+    async def _send(self, event, data):
+        await self.connection.send(json.dumps({"event": event, "data": data}))
+
+    async def _send_subscribe(self, channel):
+        data = {"channel": channel}
+        if channel.startswith(("private-", "presence-")):
+            response = await self.client._post(self.auth_endpoint, {"socket_id": self.socket_id, "channel_name": channel}, self.access_token)
+            data["auth"] = response["auth"]
+        await self._send("pusher:subscribe", data)
+
+    # Deliver messages each bubble missed while disconnected, oldest first
+    async def _fill_gaps(self):
+        for channel, bubbleID in list(self.channels.items()):
+            last_seen = self.last_seen.get(bubbleID)
+            if last_seen is None:
+                continue
+            missed = [message async for message in aiter_bubble_messages(self.client, self.access_token, bubbleID, stop_at_id=last_seen)]
+            self.resumed[bubbleID] = {int(message["id"]) for message in missed}
+            for message in sorted(missed, key=lambda message: int(message["id"])):
+                await self._dispatch(RealtimeEvent("message", "resume", channel, {"message": message}, bubbleID, resumed=True))
+
+    async def _dispatch(self, event):
+        if event.kind == "message":
+            message_id = _message_id(event.data)
+            if not event.resumed and message_id in self.resumed.get(event.bubble_id, ()):
+                return
+            if message_id is not None and event.bubble_id is not None:
+                self.last_seen[event.bubble_id] = max(message_id, self.last_seen.get(event.bubble_id, 0))
+        for handler in self.handlers.get(event.kind, []) + self.handlers.get("*", []):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as err:
+                logger.error(f"Realtime handler failed for {event.name}: {err}")
+        if self.queue is not None:
+            self.queue.put_nowait(event)
+
+#LOCAL SERVER
+# Minimal stand-in for the Pusher websocket for tests and local development. It accepts
+# any subscription (private channel auth isn't checked) and publishes whatever is passed
+# to publish().
+#EXAMPLE:
+# server = LocalPusherServer()
+# await server.start()
+# realtime = RealtimeClient(async_client, access_token, url=server.url)
+# await server.publish("private-bubble.3640189", "App\\Events\\MessageAdded", {"message": {...}})
+class LocalPusherServer:
+    def __init__(self, host="127.0.0.1", port=0, activity_timeout=DEFAULT_ACTIVITY_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.activity_timeout = activity_timeout
+        self.subscribers = {}
+        self.connections = set()
+        self.server = None
+        self.next_socket = 0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/app/local?protocol={PUSHER_PROTOCOL}"
+
+    async def start(self):
+        self.server = await serve(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    # Drop every open connection, to exercise client reconnects
+    async def drop_connections(self):
+        for connection in list(self.connections):
+            await connection.close()
+
+    async def publish(self, channel, event, data):
+        message = json.dumps({"event": event, "channel": channel, "data": json.dumps(data)})
+        for connection in list(self.subscribers.get(channel, ())):
+            try:
+                await connection.send(message)
+            except ConnectionClosed:
+                pass
+
+    async def _handle(self, connection):
+        self.next_socket += 1
+        self.connections.add(connection)
+        try:
+            await connection.send(json.dumps({
+                "event": "pusher:connection_established",
+                "data": json.dumps({"socket_id": f"{self.next_socket}.{self.next_socket}", "activity_timeout": self.activity_timeout}),
+            }))
+            async for raw in connection:
+                message = json.loads(raw)
+                name = message.get("event")
+                data = message.get("data") or {}
+                if name == "pusher:subscribe":
+                    self.subscribers.setdefault(data["channel"], set()).add(connection)
+                    await connection.send(json.dumps({"event": "pusher_internal:subscription_succeeded", "channel": data["channel"], "data": "{}"}))
+                elif name == "pusher:unsubscribe":
+                    self.subscribers.get(data["channel"], set()).discard(connection)
+                elif name == "pusher:ping":
+                    await connection.send(json.dumps({"event": "pusher:pong", "data": "{}"}))
+        except ConnectionClosed:
+            pass
+        finally:
+            self.connections.discard(connection)
+            for subscribers in self.subscribers.values():
+                subscribers.discard(connection)
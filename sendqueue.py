@@ -0,0 +1,92 @@
+import threading, time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from uuid import uuid4
+from api import get_default_client
+from ratelimit import TokenBucket
+
+# Default number of bubbles sent to at once
+DEFAULT_WORKERS = 8
+
+# Function to get the created_at timestamp Pronto expects, e.g. "2025-01-18 23:12:18" in UTC
+def pronto_timestamp(when=None):
+    when = when if when is not None else datetime.now(timezone.utc)
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+#SEND QUEUE
+# Queue for sending many messages through send_message_to_bubble concurrently.
+# enqueue returns a concurrent.futures.Future that resolves to the message.create response.
+# Messages to the same bubble are sent one after another in the order they were queued,
+# while different bubbles are sent in parallel on up to `workers` threads.
+# rate is an optional (messages per second, burst) cap across the whole queue, on top of
+# any rate limiter on the client itself.
+#EXAMPLE:
+# with SendQueue(access_token, userID, workers=16, rate=(10, 20)) as queue:
+#     futures = [queue.enqueue(bubbleID, "Office hours moved to 3pm") for bubbleID in bubble_ids]
+# results = [future.result() for future in futures]
+class SendQueue:
+    def __init__(self, access_token, userID, workers=DEFAULT_WORKERS, rate=None, client=None):
+        self.access_token = access_token
+        self.userID = userID
+        self.client = client if client is not None else get_default_client()
+        self.bucket = TokenBucket(*rate) if rate is not None else None
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.queues = {}
+        self.pending = 0
+        self.idle = threading.Condition(self.lock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Queue a message and return a Future for its message.create response
+    # created_at and uuid are filled in when they aren't given
+    # messagemedia is an optional list of attachments; one uploaded file can be sent to any number of bubbles
+    def enqueue(self, bubbleID, message, parentmessage_id=None, created_at=None, uuid=None, messagemedia=None):
+        future = Future()
+        item = (future, message, parentmessage_id, created_at or pronto_timestamp(), uuid or str(uuid4()), messagemedia)
+        with self.lock:
+            self.pending += 1
+            queue = self.queues.get(bubbleID)
+            if queue is not None:
+                queue.append(item)
+                return future
+            self.queues[bubbleID] = deque([item])
+        self.executor.submit(self._drain, bubbleID)
+        return future
+
+    # Send every queued message for one bubble in order, until its queue is empty
+    def _drain(self, bubbleID):
+        while True:
+            with self.lock:
+                queue = self.queues[bubbleID]
+                if not queue:
+                    del self.queues[bubbleID]
+                    return
+                future, message, parentmessage_id, created_at, uuid, messagemedia = queue.popleft()
+            if future.set_running_or_notify_cancel():
+                if self.bucket is not None:
+                    wait = self.bucket.reserve()
+                    if wait > 0:
+                        time.sleep(wait)
+                try:
+                    future.set_result(self.client.send_message_to_bubble(self.access_token, bubbleID, created_at, message, self.userID, uuid, parentmessage_id, messagemedia))
+                except Exception as err:
+                    future.set_exception(err)
+            with self.lock:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.idle.notify_all()
+
+    # Block until every queued message has been sent or has failed
+    def flush(self, timeout=None):
+        with self.lock:
+            return self.idle.wait_for(lambda: self.pending == 0, timeout)
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
@@ -0,0 +1,74 @@
+import asyncio, threading
+from api import READ_ENDPOINTS
+
+#SINGLE FLIGHT
+# Makes concurrent identical requests share one network call. Keys are
+# (endpoint, payload, access token), so only callers asking for exactly the same thing
+# with the same token are merged, and only for endpoints in `endpoints` (reads by
+# default, so two identical message.create calls still send two messages).
+# Every caller gets the same response object, so treat it as read-only.
+#EXAMPLE:
+# client = ProntoClient(single_flight=SingleFlight())
+# async_client = AsyncProntoClient(single_flight=AsyncSingleFlight())
+
+# In-flight call that followers wait on
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+# Single-flight group for threads, used by ProntoClient
+class SingleFlight:
+    def __init__(self, endpoints=READ_ENDPOINTS):
+        self.endpoints = frozenset(endpoints)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.shared = 0
+
+    # Run fn for key, or wait for the identical call already in flight and share its result
+    def do(self, key, fn):
+        if key[0] not in self.endpoints:
+            return fn()
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as err:
+            call.error = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+# Single-flight group for asyncio, used by AsyncProntoClient
+class AsyncSingleFlight:
+    def __init__(self, endpoints=READ_ENDPOINTS):
+        self.endpoints = frozenset(endpoints)
+        self.calls = {}
+        self.shared = 0
+
+    # Await fn() for key, or await the identical call already in flight and share its result
+    # The shared task is shielded, so one caller being cancelled doesn't cancel it for the rest
+    async def do(self, key, fn):
+        if key[0] not in self.endpoints:
+            return await fn()
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
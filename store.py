@@ -0,0 +1,161 @@
+import json, sqlite3, threading
+from api import get_default_client
+from history import iter_bubble_messages
+
+# Number of messages written per transaction while syncing
+SYNC_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    bubble_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    user_id INTEGER,
+    created_at TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (bubble_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_id ON messages (id);
+CREATE TABLE IF NOT EXISTS sync_state (
+    bubble_id INTEGER PRIMARY KEY,
+    high_water INTEGER NOT NULL
+);
+"""
+
+# Full-text index over message text, with rowid set to the message ID
+FTS_SCHEMA = "CREATE VIRTUAL TABLE messages_fts USING fts5 (message, tokenize = 'unicode61 remove_diacritics 2')"
+
+# Function to turn free text into an FTS5 query matching all of its words,
+# quoting each word so punctuation in user input can't break the query syntax
+def fts_query(query):
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+#MESSAGE STORE
+# Local SQLite copy of bubble histories, so restarts only fetch what's new.
+# Each bubble has a high-water mark, the newest message ID known to be stored along
+# with everything before it. sync() walks bubble.history from the newest message down to
+# the high-water mark and only moves the mark once the whole delta is written, so an
+# interrupted sync is simply redone next time.
+# Messages are stored as the raw JSON Pronto returned, so edits and deletions of
+# messages older than the high-water mark aren't picked up by sync().
+# Message text is also kept in an FTS5 index so searchMessage can answer locally.
+#EXAMPLE:
+# store = MessageStore("pronto.db")
+# store.sync(access_token, bubbleID)
+# latest = store.messages(bubbleID, limit=50)
+# hits = store.searchMessage(access_token, "midterm", bubbleID=bubbleID, orderby="newest")
+class MessageStore:
+    def __init__(self, path, client=None):
+        self.client = client if client is not None else get_default_client()
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        if self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone() is None:
+            with self.db:
+                self.db.execute(FTS_SCHEMA)
+            self.rebuild_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    # Insert or update messages for a bubble, e.g. as a BackfillEngine sink
+    def add_messages(self, bubbleID, messages):
+        rows = [(int(bubbleID), int(message["id"]), message.get("user_id"), message.get("created_at"), json.dumps(message)) for message in messages]
+        with self.lock, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO messages (bubble_id, id, user_id, created_at, data) VALUES (?, ?, ?, ?, ?)", rows)
+            self.db.executemany("INSERT OR REPLACE INTO messages_fts (rowid, message) VALUES (?, ?)", [(int(message["id"]), message.get("message") or "") for message in messages])
+
+    # Rebuild the full-text index from the stored messages
+    def rebuild_index(self):
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM messages_fts")
+            self.db.execute("INSERT INTO messages_fts (rowid, message) SELECT id, coalesce(json_extract(data, '$.message'), '') FROM messages")
+
+    # Returns the bubble's high-water mark, or None if it has never been synced
+    def high_water(self, bubbleID):
+        with self.lock:
+            row = self.db.execute("SELECT high_water FROM sync_state WHERE bubble_id = ?", (int(bubbleID),)).fetchone()
+        return row[0] if row else None
+
+    # Record that every message up to and including high_water is stored
+    def set_high_water(self, bubbleID, high_water):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO sync_state (bubble_id, high_water) VALUES (?, ?)", (int(bubbleID), int(high_water)))
+
+    # Fetch and store every message newer than the high-water mark
+    # Returns the number of new messages stored
+    def sync(self, access_token, bubbleID):
+        high_water = self.high_water(bubbleID)
+        newest = high_water
+        batch = []
+        count = 0
+        for message in iter_bubble_messages(access_token, bubbleID, stop_at_id=high_water, prefetch=True, client=self.client):
+            newest = max(newest or 0, int(message["id"]))
+            batch.append(message)
+            if len(batch) >= SYNC_BATCH_SIZE:
+                self.add_messages(bubbleID, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.add_messages(bubbleID, batch)
+            count += len(batch)
+        if newest is not None:
+            self.set_high_water(bubbleID, newest)
+        return count
+
+    # Returns stored messages for a bubble, newest first
+    # before is an optional message ID to page backwards from, like bubble.history's latest
+    def messages(self, bubbleID, limit=50, before=None):
+        query = "SELECT data FROM messages WHERE bubble_id = ?"
+        params = [int(bubbleID)]
+        if before is not None:
+            query += " AND id < ?"
+            params.append(int(before))
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.db.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # Returns one stored message by ID, or None
+    def message(self, messageID):
+        with self.lock:
+            row = self.db.execute("SELECT data FROM messages WHERE id = ?", (int(messageID),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # Full-text search over stored messages, with the same filters as searchMessage
+    # orderby is "newest" or "oldest", or None for best match first
+    def search(self, query, bubbleID=None, orderby=None, user_ids=None, size=25, offset=0):
+        sql = "SELECT m.data FROM messages_fts f JOIN messages m ON m.id = f.rowid WHERE messages_fts MATCH ?"
+        params = [fts_query(query)]
+        if bubbleID is not None:
+            sql += " AND m.bubble_id = ?"
+            params.append(int(bubbleID))
+        if user_ids:
+            sql += f" AND m.user_id IN ({', '.join('?' * len(user_ids))})"
+            params.extend(int(user_id) for user_id in user_ids)
+        sql += {"newest": " ORDER BY m.id DESC", "oldest": " ORDER BY m.id ASC"}.get(orderby, " ORDER BY f.rank")
+        sql += " LIMIT ? OFFSET ?"
+        params.extend([size, offset])
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # Drop-in for searchMessage that answers from the local index when it can.
+    # With prefer_local=True a search inside a bubble that has been synced is answered
+    # locally; searches across all bubbles, or in bubbles that were never synced, still
+    # go to the server since the index can't know what it's missing.
+    # Local results come back as {"messages": [...], "local": True}
+    # The arguments match api.searchMessage, with prefer_local as a keyword-only extra
+    def searchMessage(self, access_token, query, bubbleID=None, orderby=None, user_ids=None, size=25, from_=0, *, prefer_local=True):
+        if prefer_local and bubbleID is not None and self.high_water(bubbleID) is not None:
+            return {"messages": self.search(query, bubbleID, orderby, user_ids, size, from_), "local": True}
+        return self.client.searchMessage(access_token, query, bubbleID, orderby, user_ids, size, from_)
@@ -0,0 +1,146 @@
+import itertools, logging, threading, time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+from api import BackendError, get_default_client
+
+# Refresh access tokens this many seconds before they expire
+DEFAULT_REFRESH_MARGIN = 300.0
+
+logger = logging.getLogger(__name__)
+
+# Function to turn an expiry timestamp such as "2025-01-18 23:12:18" (UTC) into epoch seconds
+def parse_expiry(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+# Function to get (access token, expiry) out of a login_token_to_access_token response
+def parse_token_response(response):
+    entry = response
+    if isinstance(response.get("users"), list) and response["users"]:
+        entry = response["users"][0]
+    access_token = entry.get("accesstoken") or entry.get("access_token")
+    if access_token is None:
+        raise BackendError("No access token in user.tokenlogin response")
+    return access_token, parse_expiry(entry.get("accesstokenexpiration") or entry.get("expires_at"))
+
+# One account in the pool; expires_at is epoch seconds, or None if unknown
+@dataclass(slots=True)
+class Account:
+    login_token: str
+    access_token: Optional[str] = None
+    expires_at: Optional[float] = None
+    failed: bool = False
+
+#TOKEN MANAGER
+# Keeps access tokens for one or more accounts fresh. Tokens are refreshed from their
+# login token refresh_margin seconds before they expire (by a background thread after
+# start(), or on demand otherwise), and a 401 makes the client refresh and retry once.
+# With several accounts, get_token() hands them out round-robin to spread load.
+# Clients use it when they're given token_manager= and a call passes access_token=None.
+#EXAMPLE:
+# tokens = TokenManager()
+# tokens.add_account(login_token)
+# tokens.start()
+# client = ProntoClient(token_manager=tokens)
+# client.getUsersBubbles(None)
+class TokenManager:
+    def __init__(self, client=None, refresh_margin=DEFAULT_REFRESH_MARGIN):
+        self.client = client if client is not None else get_default_client()
+        self.refresh_margin = refresh_margin
+        self.accounts = []
+        self.lock = threading.Lock()
+        self.refresh_locks = {}
+        self.rotation = itertools.count()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    # Add an account by login token, optionally with an access token it already has
+    def add_account(self, login_token, access_token=None, expires_at=None):
+        account = Account(login_token, access_token, parse_expiry(expires_at))
+        with self.lock:
+            self.accounts.append(account)
+            self.refresh_locks[id(account)] = threading.Lock()
+        return account
+
+    def _needs_refresh(self, account, margin=0.0):
+        if account.access_token is None:
+            return True
+        return account.expires_at is not None and account.expires_at - margin <= time.time()
+
+    # Exchange the account's login token for a new access token
+    def refresh(self, account, stale_token=None):
+        with self.refresh_locks[id(account)]:
+            # Another thread may have refreshed while we waited for the lock
+            if account.access_token is not None and account.access_token != stale_token and not self._needs_refresh(account):
+                return account.access_token
+            try:
+                account.access_token, account.expires_at = parse_token_response(self.client.login_token_to_access_token(account.login_token))
+            except BackendError:
+                account.failed = True
+                raise
+            account.failed = False
+            return account.access_token
+
+    # Returns a valid access token without blocking, or None if one needs refreshing
+    def peek_token(self):
+        with self.lock:
+            ready = [account for account in self.accounts if not account.failed and not self._needs_refresh(account)]
+            if not ready:
+                return None
+            return ready[next(self.rotation) % len(ready)].access_token
+
+    # Returns a valid access token, refreshing one if none is ready
+    def get_token(self):
+        token = self.peek_token()
+        if token is not None:
+            return token
+        with self.lock:
+            candidates = [account for account in self.accounts if not account.failed] or list(self.accounts)
+        if not candidates:
+            raise BackendError("TokenManager has no accounts")
+        error = None
+        for account in candidates:
+            try:
+                return self.refresh(account)
+            except BackendError as err:
+                error = err
+        raise error
+
+    # Called after a 401 with the token that was rejected; returns a fresh token to retry with
+    def handle_unauthorized(self, access_token):
+        with self.lock:
+            account = next((account for account in self.accounts if account.access_token == access_token), None)
+        if account is None:
+            return self.get_token()
+        return self.refresh(account, stale_token=access_token)
+
+    # Refresh tokens in a background thread before they expire
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._refresh_loop, name="pronto-token-refresh", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _refresh_loop(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                accounts = list(self.accounts)
+            next_wake = self.refresh_margin
+            for account in accounts:
+                if self._needs_refresh(account, self.refresh_margin):
+                    try:
+                        self.refresh(account, stale_token=account.access_token)
+                    except BackendError as err:
+                        logger.error(f"Background token refresh failed: {err}")
+                if account.expires_at is not None and not account.failed:
+                    next_wake = min(next_wake, account.expires_at - self.refresh_margin - time.time())
+            self.stopped.wait(max(1.0, next_wake))
@@ -0,0 +1,133 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from api import BackendError, get_default_client
+from cache import ResponseCache
+from singleflight import SingleFlight
+
+# Default number of user.info calls made at once when resolving unknown users
+DEFAULT_WORKERS = 16
+# Default seconds a known user is served without asking the API again, and how many users
+# are kept, when the client has no ResponseCache to share
+DEFAULT_TTL = 300
+DEFAULT_MAXSIZE = 10000
+# A dict with an "id" and one of these keys is taken to be a user object
+USER_FIELDS = ("firstname", "lastname", "fullname")
+
+logger = logging.getLogger(__name__)
+
+# Function to normalise a user ID, since responses mix ints and numeric strings
+def _user_key(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return user_id
+
+# Function to find every user object embedded in a response, such as the user on each
+# bubble.history message or bubble.membershipsearch entry
+def embedded_users(response):
+    found = []
+    stack = [response]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if value.get("id") is not None and any(field in value for field in USER_FIELDS):
+                found.append(value)
+            stack.extend(item for item in value.values() if isinstance(item, (dict, list)))
+        elif isinstance(value, list):
+            stack.extend(item for item in value if isinstance(item, (dict, list)))
+    return found
+
+# Function to tell whether a client cache can hold the directory's users: it has to cache
+# user.info and offer peek and invalidate on top of the lookup/record every cache has
+def _shareable(cache):
+    return cache is not None and "user.info" in getattr(cache, "ttls", ()) and all(hasattr(cache, name) for name in ("peek", "invalidate"))
+
+#USER DIRECTORY
+# Resolves many user IDs at once instead of one userInfo call per ID. IDs are deduped,
+# users already known are served from memory, and the rest are fetched concurrently,
+# up to `workers` at a time. Users embedded in responses the caller already has
+# (bubble.list, bubble.history, bubble.membershipsearch, ...) can be fed in with learn(),
+# so rendering a bubble usually needs no user.info calls at all.
+# Concurrent resolves of the same unknown user share one request.
+# Known users live in the client's ResponseCache as user.info responses, so learned users
+# also answer client.userInfo() and presence writes invalidate them. If the client has no
+# cache, or one that doesn't cache user.info, a private ResponseCache with ttl and maxsize
+# is used instead.
+# The API has no batch user lookup, so unknown users are still one user.info call each.
+#EXAMPLE:
+# directory = UserDirectory(access_token)
+# history = get_bubble_messages(access_token, bubbleID)
+# directory.learn(history)
+# users = directory.resolve_users(message["user_id"] for message in history["messages"])
+class UserDirectory:
+    def __init__(self, access_token, client=None, workers=DEFAULT_WORKERS, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE):
+        self.access_token = access_token
+        self.client = client if client is not None else get_default_client()
+        self.workers = workers
+        cache = getattr(self.client, "cache", None)
+        self.cache = cache if _shareable(cache) else ResponseCache(maxsize, ttls={"user.info": ttl})
+        self.single_flight = SingleFlight(endpoints=("user.info",))
+        self.fetched = 0
+
+    # Remember a user dict, merging it over what is already known about that user
+    def _store(self, user):
+        payload = {"id": _user_key(user.get("id"))}
+        known = self.cache.peek("user.info", payload, self.access_token)
+        if known is not None:
+            user = {**known.get("user", known), **user}
+        self.cache.record("user.info", payload, self.access_token, {"user": user})
+        return user
+
+    # Record every user embedded in a response, returning how many were found
+    def learn(self, response):
+        users = embedded_users(response)
+        for user in users:
+            self._store(user)
+        return len(users)
+
+    # Returns the known user dict for user_id, or None if it's unknown or stale
+    def get(self, user_id):
+        hit, response = self.cache.lookup("user.info", {"id": _user_key(user_id)}, self.access_token)
+        return response.get("user", response) if hit else None
+
+    def forget(self, user_id=None):
+        self.cache.invalidate("user.info", {"id": _user_key(user_id)} if user_id is not None else None)
+
+    def _fetch(self, user_id):
+        try:
+            response = self.single_flight.do(("user.info", user_id), lambda: self.client.userInfo(self.access_token, user_id))
+        except BackendError as err:
+            logger.error(f"Resolving user {user_id} failed: {err}")
+            return None
+        self.fetched += 1
+        return self._store(response.get("user", response))
+
+    # Returns {user ID: user dict} for every distinct ID, in the order first given
+    # Users that couldn't be fetched map to None, so the result can be rendered in one pass
+    def resolve_users(self, ids):
+        ids = list(dict.fromkeys(_user_key(user_id) for user_id in ids if user_id is not None))
+        users = {user_id: self.get(user_id) for user_id in ids}
+        missing = [user_id for user_id, user in users.items() if user is None]
+        if len(missing) == 1:
+            users[missing[0]] = self._fetch(missing[0])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as executor:
+                users.update(zip(missing, executor.map(self._fetch, missing)))
+        return users
+
+    # Async counterpart of resolve_users, fetching unknown users through an AsyncProntoClient
+    # Concurrency is bounded by the client's max_concurrency
+    async def aresolve_users(self, client, ids):
+        ids = list(dict.fromkeys(_user_key(user_id) for user_id in ids if user_id is not None))
+        users = {user_id: self.get(user_id) for user_id in ids}
+        missing = [user_id for user_id, user in users.items() if user is None]
+        responses = await client.gather((client.userInfo(self.access_token, user_id) for user_id in missing), return_exceptions=True)
+        for user_id, response in zip(missing, responses):
+            if isinstance(response, BaseException):
+                if not isinstance(response, BackendError):
+                    raise response
+                logger.error(f"Resolving user {user_id} failed: {response}")
+                continue
+            self.fetched += 1
+            users[user_id] = self._store(response.get("user", response))
+        return users
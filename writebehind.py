@@ -0,0 +1,128 @@
+import logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from api import BackendError, get_default_client
+
+# Default seconds between flushes
+DEFAULT_FLUSH_INTERVAL = 2.0
+# Most presence entries sent in one clients/users/presence request
+DEFAULT_MAX_BATCH = 100
+# Default number of bubble.mark calls made at once during a flush
+DEFAULT_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+# Function to tell whether a failed write is worth trying again on the next flush
+def _retriable(err):
+    return err.network_error or err.status_code is not None and (err.status_code == 429 or err.status_code >= 500)
+
+#WRITE BEHIND
+# Coalescing queue for fire-and-forget writes: markBubble and setStatus return at once
+# and the writes are sent in the background every flush_interval seconds. Within a
+# window only the latest write counts: a bubble marked ten times is marked once, and only
+# each user's latest presence is sent, with up to max_batch users packed into one
+# clients/users/presence request. A full presence batch flushes early, and close()
+# flushes whatever is left. Writes that fail with a network error, 429 or 5xx are kept
+# for the next flush unless a newer write replaced them; other failures are logged and dropped.
+#EXAMPLE:
+# with WriteBehindQueue(access_token) as writes:
+#     writes.markBubble(bubbleID)
+#     writes.setStatus(userID, True, pronto_timestamp())
+class WriteBehindQueue:
+    def __init__(self, access_token, flush_interval=DEFAULT_FLUSH_INTERVAL, max_batch=DEFAULT_MAX_BATCH, workers=DEFAULT_WORKERS, client=None):
+        self.access_token = access_token
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.workers = workers
+        self.client = client if client is not None else get_default_client()
+        self.lock = threading.Lock()
+        # Pending writes, keyed so a newer write replaces an older one
+        self.marks = {}
+        self.presence = {}
+        self.queued = 0
+        self.sent = 0
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="pronto-write-behind", daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def markBubble(self, bubbleID):
+        with self.lock:
+            self.queued += 1
+            self.marks[bubbleID] = True
+
+    def setStatus(self, userID, isonline, lastpresencetime):
+        with self.lock:
+            self.queued += 1
+            self.presence[userID] = {"user_id": userID, "isonline": isonline, "lastpresencetime": lastpresencetime}
+            full = len(self.presence) >= self.max_batch
+        if full:
+            self.wake.set()
+
+    # Returns how many writes were queued, and how many requests were actually sent
+    def stats(self):
+        with self.lock:
+            return {"queued": self.queued, "sent": self.sent, "pending": len(self.marks) + len(self.presence)}
+
+    def _mark(self, bubbleID):
+        try:
+            self.client.markBubble(self.access_token, bubbleID)
+        except BackendError as err:
+            logger.error(f"Marking bubble {bubbleID} failed: {err}")
+            if _retriable(err):
+                with self.lock:
+                    self.marks.setdefault(bubbleID, True)
+            return 0
+        return 1
+
+    def _send_presence(self, entries):
+        try:
+            self.client.setStatuses(self.access_token, entries)
+        except BackendError as err:
+            logger.error(f"Sending presence for {len(entries)} users failed: {err}")
+            if _retriable(err):
+                with self.lock:
+                    for entry in entries:
+                        self.presence.setdefault(entry["user_id"], entry)
+            return 0
+        return 1
+
+    # Send everything pending now
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                marks, self.marks = list(self.marks), {}
+                entries, self.presence = list(self.presence.values()), {}
+            sent = 0
+            for start in range(0, len(entries), self.max_batch):
+                sent += self._send_presence(entries[start:start + self.max_batch])
+            if len(marks) == 1:
+                sent += self._mark(marks[0])
+            elif marks:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(marks))) as executor:
+                    sent += sum(executor.map(self._mark, marks))
+            with self.lock:
+                self.sent += sent
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            # Keep flushing later writes even if one flush fails unexpectedly
+            try:
+                self.flush()
+            except Exception as err:
+                logger.error(f"Write-behind flush failed: {err!r}")
+
+    # Stop the background thread and send whatever is still pending
+    def close(self):
+        self.stopped.set()
+        self.wake.set()
+        self.thread.join()
+        self.flush()